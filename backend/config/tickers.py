@@ -24,26 +24,26 @@ SUPPORTED_TICKERS_RAW = [
     "RPL", "LQTY", "NEWT", "GRASS", "DEGO", "BABYDOGE", "ALU", "BULLA", "MINA", "XDC", "NMR"
 ]
 
-# Преобразуем в формат USDT пар
-SUPPORTED_TICKERS = []
+# Тикеры, которые пока пропускаем:
+# KAITO, GRIFFAIN, SKYAI, AVAAI, MELANIA - новые токены, могут быть недоступны на MEXC
+# BTCDOM - это индекс, не торговая пара
+EXCLUDED = frozenset({"KAITO", "GRIFFAIN", "SKYAI", "AVAAI", "MELANIA", "BTCDOM"})
 
-for ticker in SUPPORTED_TICKERS_RAW:
-    # Обрабатываем специальные случаи
-    if ticker == "BANANAS31":
-        SUPPORTED_TICKERS.append("BANANASUSDT")
-    elif ticker == "KAITO":  # Может быть недоступен на MEXC
-        continue  # Пропускаем пока
-    elif ticker in ["GRIFFAIN", "SKYAI", "AVAAI", "MELANIA"]:  # Новые токены, могут быть недоступны
-        continue
-    elif ticker == "BTCDOM":  # Это индекс, не торговая пара
-        continue
-    elif len(ticker) == 1:  # Однобуквенные тикеры могут вызвать проблемы
-        continue
-    else:
-        SUPPORTED_TICKERS.append(f"{ticker}USDT")
+# Специальные случаи переименования тикеров
+RENAME = {"BANANAS31": "BANANAS"}
 
-# Финальный список для использования
-print(f"Total tickers configured: {len(SUPPORTED_TICKERS)}")
+# Преобразуем в формат USDT пар (однобуквенные тикеры могут вызвать проблемы)
+SUPPORTED_TICKERS = [
+    f"{RENAME.get(ticker, ticker)}USDT"
+    for ticker in SUPPORTED_TICKERS_RAW
+    if len(ticker) > 1 and ticker not in EXCLUDED
+]
+
+# Множество для быстрой (O(1)) проверки принадлежности символа
+SUPPORTED_TICKERS_SET = frozenset(SUPPORTED_TICKERS)
 
 # Группы тикеров для batch обработки
-BATCH_SIZE = 50  # Максимум тикеров в одном batch запросе
\ No newline at end of file
+BATCH_SIZE = 50  # Максимум тикеров в одном batch запросе
+
+if __name__ == "__main__":
+    print(f"Total tickers configured: {len(SUPPORTED_TICKERS)}")
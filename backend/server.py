@@ -1,30 +1,56 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Query
+from fastapi import FastAPI, APIRouter, HTTPException, Query, Request, Response
 from dotenv import load_dotenv
+from fastapi.responses import ORJSONResponse
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi.middleware.gzip import GZipMiddleware
+from pymongo import AsyncMongoClient
+from bson import ObjectId
+from bson.errors import InvalidId
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set, Tuple
 import uuid
 from datetime import datetime
 import asyncio
-from services.mexc_service_optimized import optimized_mexc_service
+import base64
+import hashlib
+import time
+import orjson
+from functools import lru_cache
+from services.mexc_service_optimized import optimized_mexc_service, parse_ticker_rows, TickerSnapshot
 from services.price_tracker_advanced import advanced_price_tracker
+from services.redis_cache import RedisTickerCache
+from services.http import close_shared_session
 from config.tickers import SUPPORTED_TICKERS
 
 
+# Configure logging (до первого использования logger)
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+# MongoDB connection (нативный asyncio-драйвер PyMongo, без пула потоков Motor)
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncMongoClient(mongo_url, maxPoolSize=50)
 db = client[os.environ['DB_NAME']]
 
+# Общий кэш снимка тикеров в Redis для нескольких воркеров (включается переменной REDIS_URL)
+redis_ticker_cache = RedisTickerCache(os.environ.get('REDIS_URL'), ttl=2.0)
+
 # Create the main app without a prefix
-app = FastAPI(title="MEXC TradingView Screener API", version="3.0.0")
+# orjson вместо стандартного json для сериализации всех ответов
+app = FastAPI(
+    title="MEXC TradingView Screener API",
+    version="3.0.0",
+    default_response_class=ORJSONResponse
+)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -78,48 +104,172 @@ class CryptoPricesResponse(BaseModel):
     data: Dict[str, CryptoPrice]
     timestamp: str
     count: int
-    total_available: int
+    total_available: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 class TickersListResponse(BaseModel):
     tickers: List[str]
     count: int
     timestamp: str
 
+# Список тикеров статичен после импорта - сериализуем его один раз.
+# Открытый префикс JSON-объекта, к которому в запросе дописывается только timestamp.
+_TICKERS_JSON_PREFIX = orjson.dumps({
+    "tickers": SUPPORTED_TICKERS,
+    "count": len(SUPPORTED_TICKERS)
+})[:-1]
+
+# Заголовок кэширования для редко меняющихся ответов (/health, /tickers),
+# чтобы основную часть запросов мог обслужить reverse proxy / CDN
+STATIC_CACHE_CONTROL = "public, max-age=2"
+
+def _make_etag(content: bytes) -> str:
+    """
+    Построить слабый ETag по содержимому ответа: ответ проходит через GZipMiddleware,
+    и байты тела зависят от кодирования, поэтому сильный валидатор здесь неверен
+    """
+    return 'W/"' + hashlib.blake2b(content, digest_size=8).hexdigest() + '"'
+
+_TICKERS_ETAG = _make_etag(_TICKERS_JSON_PREFIX)
+
+# Короткоживущий кэш ответов /crypto/prices:
+# {параметры запроса: (время истечения, версия снимка, тело ответа)}.
+# Фоновая задача обновляет цены раз в 2 секунды, поэтому одинаковые запросы
+# в пределах TTL и одной версии снимка получают одно и то же уже сериализованное тело.
+PRICES_CACHE_TTL = 1.0
+PRICES_CACHE_MAXSIZE = 256
+_prices_cache: Dict[tuple, Tuple[float, int, bytes]] = {}
+_prices_cache_locks: Dict[tuple, asyncio.Lock] = {}
+
+def _prices_etag(version: int, key: tuple) -> str:
+    """Слабый ETag ответа /crypto/prices: версия снимка + параметры запроса"""
+    return f'W/"{version}-{hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()}"'
+
+def _prune_prices_cache(now: float):
+    """Удалить истекшие записи кэша, а при переполнении - самые старые"""
+    if len(_prices_cache) < PRICES_CACHE_MAXSIZE:
+        return
+    
+    expired = [key for key, entry in _prices_cache.items() if entry[0] <= now]
+    for key in expired:
+        del _prices_cache[key]
+    
+    while len(_prices_cache) >= PRICES_CACHE_MAXSIZE:
+        del _prices_cache[next(iter(_prices_cache))]
+    
+    # Блокировки храним только для ключей, которые есть в кэше или строятся прямо сейчас
+    for key in [key for key, lock in _prices_cache_locks.items() if key not in _prices_cache and not lock.locked()]:
+        del _prices_cache_locks[key]
+
 # Фоновая задача для сбора данных
 background_task_running = False
+PRICE_COLLECTION_INTERVAL = 2.0  # секунд между началами тиков
+
+# Сильные ссылки на фоновые задачи: event loop хранит задачи только по слабой ссылке,
+# а при остановке их нужно отменить до закрытия HTTP-сессии и клиента MongoDB
+_bg_tasks: Set[asyncio.Task] = set()
+
+def _spawn(coro) -> asyncio.Task:
+    """Запустить фоновую задачу и отслеживать ее до завершения"""
+    task = asyncio.create_task(coro)
+    _bg_tasks.add(task)
+    task.add_done_callback(_bg_tasks.discard)
+    return task
+
+# Время последнего обновления снимка тикеров (ISO), обновляется раз за тик фоновой задачи
+_current_iso_ts: Optional[str] = None
+
+# Версия данных /crypto/prices (снимок тикеров + трекер), увеличивается при каждом обновлении
+_snapshot_version = 0
+
+async def fetch_ticker_data(force_refresh: bool = False,
+                            newer_than: Optional[float] = None) -> Tuple[float, Dict[str, Dict]]:
+    """
+    Получить сырые 24h данные поддерживаемых тикеров: из общего кэша Redis,
+    если другой воркер уже обновил его в этом тике, иначе из MEXC API
+    
+    Args:
+        force_refresh: Не читать Redis, всегда запрашивать MEXC
+        newer_than: fetched_at снимка, уже учтенного вызывающим; снимок из Redis
+            не новее него (например, записанный этим же воркером) не используется
+    
+    Returns:
+        Кортеж (время получения снимка из MEXC, {symbol: raw_data})
+    """
+    if not force_refresh:
+        cached = await redis_ticker_cache.get()
+        if cached is not None and (newer_than is None or cached[0] > newer_than):
+            return cached
+    
+    raw_data = await optimized_mexc_service.get_filtered_tickers(SUPPORTED_TICKERS)
+    fetched_at = time.time()
+    await redis_ticker_cache.set(raw_data, fetched_at)
+    return fetched_at, raw_data
 
 async def background_price_collection():
     """Продвинутая фоновая задача для сбора ценовых данных с поддержкой множественных таймфреймов"""
-    global background_task_running
+    global background_task_running, _current_iso_ts, _snapshot_version
     background_task_running = True
     
     logger.info(f"Starting advanced background price collection for {len(SUPPORTED_TICKERS)} tickers with multiple timeframes...")
     
+    # Функции цикла связываем с локальными именами один раз (LOAD_FAST вместо глобального поиска)
+    fetch_tickers = fetch_ticker_data
+    parse_rows = parse_ticker_rows
+    build_snapshot = TickerSnapshot
+    update_snapshot = advanced_price_tracker.update_ticker_snapshot
+    add_points = advanced_price_tracker.add_price_points_batch
+    sleep = asyncio.sleep
+    wall_time = time.time
+    utcfromtimestamp = datetime.utcfromtimestamp
+    clock = asyncio.get_running_loop().time
+    
+    # Тики планируются от монотонного времени: длительность запроса к MEXC
+    # не сдвигает расписание
+    next_tick = clock()
+    # Время получения последнего учтенного снимка: TTL в Redis равен интервалу тика,
+    # и без этой проверки воркер мог бы прочитать свой же прошлый снимок
+    # и записать те же цены в трекер еще раз с новым временем
+    consumed_at: Optional[float] = None
     while background_task_running:
+        next_tick += PRICE_COLLECTION_INTERVAL
         try:
             # Получаем все данные одним запросом
-            raw_data = await optimized_mexc_service.get_filtered_tickers(SUPPORTED_TICKERS)
+            consumed_at, raw_data = await fetch_tickers(newer_than=consumed_at)
             
-            # Обновляем продвинутый трекер цен
-            valid_updates = 0
-            for symbol, ticker_data in raw_data.items():
-                if 'error' not in ticker_data:
-                    try:
-                        price = float(ticker_data.get("lastPrice", 0))
-                        volume = float(ticker_data.get("volume", 0))
-                        if price > 0:
-                            advanced_price_tracker.add_price_point(symbol, price, volume)
-                            valid_updates += 1
-                    except (ValueError, TypeError):
-                        continue
+            # Разбираем и сортируем данные один раз - из снимка обслуживаются запросы /crypto/prices
+            rows = parse_rows(raw_data)
+            update_snapshot(build_snapshot(rows))
+            # Эпоха берется из time.time(): utcnow().timestamp() трактует наивное UTC
+            # как локальное время и на серверах не в UTC сдвигает точки на смещение пояса
+            now = wall_time()
+            _current_iso_ts = utcfromtimestamp(now).isoformat()
+            
+            # Обновляем продвинутый трекер цен одним batch-вызовом с временем тика
+            # (точки с нулевой ценой трекер отбрасывает сам)
+            points = [
+                (symbol, row.price, row.volume)
+                for symbol, row in rows.items()
+                if row.error is None
+            ]
+            add_points(points, now)
+            _snapshot_version += 1
             
-            logger.debug(f"Updated {valid_updates}/{len(raw_data)} tickers with advanced tracking")
+            # %-форматирование: строка собирается, только если DEBUG включен
+            logger.debug("Updated %d/%d tickers with advanced tracking", len(points), len(rows))
             
         except Exception as e:
-            logger.error(f"Error in advanced background price collection: {str(e)}")
+            logger.error("Error in advanced background price collection: %s", e)
         
-        # Ждем 2 секунды перед следующим обновлением
-        await asyncio.sleep(2)
+        # Ждем начала следующего тика
+        delay = next_tick - clock()
+        if delay > 0:
+            await sleep(delay)
+        else:
+            # Пропущенные тики не догоняем - начинаем новое расписание с текущего момента
+            logger.warning("Background price collection overran its %ss budget by %.2fs", PRICE_COLLECTION_INTERVAL, -delay)
+            next_tick = clock()
+            await sleep(0)
 
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
@@ -136,156 +286,253 @@ async def root():
     }
 
 @api_router.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """Проверка работоспособности продвинутого API"""
     active_symbols = advanced_price_tracker.get_active_symbols_count()
     
-    return {
+    status = {
         "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat(),
         "total_supported_tickers": len(SUPPORTED_TICKERS),
         "active_symbols": active_symbols,
         "background_task_running": background_task_running,
         "features": "TradingView charts with 8 timeframes",
         "version": "3.0.0"
     }
+    
+    # ETag считаем по содержимому без timestamp и счетчиков Redis,
+    # иначе он менялся бы на каждый запрос
+    etag = _make_etag(orjson.dumps(status))
+    headers = {"ETag": etag, "Cache-Control": STATIC_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    if redis_ticker_cache.enabled:
+        status["redis_cache"] = redis_ticker_cache.get_stats()
+    status["timestamp"] = datetime.utcnow().isoformat()
+    return ORJSONResponse(status, headers=headers)
 
 @api_router.get("/tickers", response_model=TickersListResponse)
-async def get_supported_tickers():
+async def get_supported_tickers(request: Request):
     """Получить список всех поддерживаемых тикеров"""
-    return TickersListResponse(
-        tickers=SUPPORTED_TICKERS,
-        count=len(SUPPORTED_TICKERS),
-        timestamp=datetime.utcnow().isoformat()
-    )
+    headers = {"ETag": _TICKERS_ETAG, "Cache-Control": STATIC_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == _TICKERS_ETAG:
+        return Response(status_code=304, headers=headers)
+    
+    body = _TICKERS_JSON_PREFIX + b',"timestamp":"' + datetime.utcnow().isoformat().encode() + b'"}'
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Допустимые значения sort_by для /crypto/prices
+SORT_FIELDS = frozenset(
+    ["symbol", "price", "changePercent24h", "volume"]
+    + list(advanced_price_tracker.FIXED_CHANGE_COLUMNS)
+    + list(advanced_price_tracker.INTERVAL_CHANGE_COLUMNS)
+)
+
+INTERVAL_SECONDS = {
+    '2s': 2, '5s': 5, '10s': 10, '15s': 15, '30s': 30,
+    '1m': 60, '2m': 120, '3m': 180, '5m': 300, '10m': 600,
+    '15m': 900, '20m': 1200, '30m': 1800, '1h': 3600,
+    '4h': 14400, '24h': 86400, '1d': 86400
+}
 
 def parse_interval_to_seconds(interval: str) -> int:
     """Convert interval string to seconds"""
-    interval_map = {
-        '2s': 2, '5s': 5, '10s': 10, '15s': 15, '30s': 30,
-        '1m': 60, '2m': 120, '3m': 180, '5m': 300, '10m': 600,
-        '15m': 900, '20m': 1200, '30m': 1800, '1h': 3600,
-        '4h': 14400, '24h': 86400, '1d': 86400
-    }
-    return interval_map.get(interval, 15)  # Default to 15 seconds
+    return INTERVAL_SECONDS.get(interval, 15)  # Default to 15 seconds
 
-@api_router.get("/crypto/prices", response_model=CryptoPricesResponse)
+@lru_cache(maxsize=256)
+def parse_chart_params(timeframes: str, interval_configs: str) -> Tuple[Tuple[str, ...], Tuple[str, ...], Tuple[int, ...]]:
+    """
+    Разобрать параметры timeframes и interval_configs запроса /crypto/prices.
+    Клиенты повторяют одни и те же строки, поэтому результат кэшируется.
+    
+    Returns:
+        (таймфреймы свечей, 3 интервала колонок, те же интервалы в секундах)
+    """
+    tf_list = tuple(tf.strip() for tf in timeframes.split(',') if tf.strip())
+    if not tf_list:
+        tf_list = ('30s', '1m', '5m')  # По умолчанию
+    
+    interval_list = tuple(iv.strip() for iv in interval_configs.split(',') if iv.strip())
+    if len(interval_list) != 3:
+        interval_list = ('15s', '30s', '24h')  # По умолчанию 3 колонки
+    
+    return tf_list, interval_list, tuple(parse_interval_to_seconds(iv) for iv in interval_list)
+
+@api_router.get("/crypto/prices", responses={200: {"model": CryptoPricesResponse}})
 async def get_crypto_prices(
+    request: Request,
     limit: Optional[int] = Query(default=20, ge=1, le=50, description="Number of tickers to return"),
     offset: Optional[int] = Query(default=0, ge=0, description="Offset for pagination"),
     sort_by: Optional[str] = Query(default="symbol", description="Sort by: symbol, price, changePercent24h, volume, change_15s, change_30s, change_interval_0, change_interval_1, change_interval_2"),
     sort_order: Optional[str] = Query(default="asc", description="Sort order: asc, desc"),
     search: Optional[str] = Query(default=None, description="Search filter for symbol names"),
     timeframes: Optional[str] = Query(default="15s,30s,1m", description="Comma-separated list of timeframes"),
-    interval_configs: Optional[str] = Query(default="15s,30s,24h", description="Comma-separated list of 3 intervals for table columns")
+    interval_configs: Optional[str] = Query(default="15s,30s,24h", description="Comma-separated list of 3 intervals for table columns"),
+    cursor: Optional[str] = Query(default=None, description="Cursor from next_cursor of the previous page; replaces offset"),
+    skip_total: bool = Query(default=False, description="Omit total_available from the response"),
+    force_refresh: bool = Query(default=False, description="Debug only: fetch fresh data from MEXC instead of the background snapshot")
 ):
     """
-    Получить актуальные цены криптовалют с продвинутыми графиками и настраиваемыми интервалами
+    Получить актуальные цены криптовалют с продвинутыми графиками и настраиваемыми интервалами.
+    
+    Для последовательного обхода страниц рекомендуется cursor (next_cursor из предыдущего ответа):
+    страница начинается после ключа сортировки (значение, символ) последней полученной строки.
+    Строки, чьи значения не изменились, не пропускаются и не повторяются; строка, значение
+    которой между запросами перешло через границу страницы, может попасть в обе страницы или ни в одну.
     """
+    if sort_by not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Unsupported sort_by: {sort_by}")
+    
+    after = _decode_cursor(cursor) if cursor else None
+    key = (limit, offset, sort_by, sort_order, search, timeframes, interval_configs, after, skip_total)
+    headers = {"Cache-Control": f"max-age={int(PRICES_CACHE_TTL)}"}
+    
+    # Клиент уже получил ответ на эти параметры для текущей версии данных
+    current_etag = _prices_etag(_snapshot_version, key)
+    if not force_refresh and request.headers.get("if-none-match") == current_etag:
+        return Response(status_code=304, headers={**headers, "ETag": current_etag})
+    
+    cached = _prices_cache.get(key)
+    if not force_refresh and cached is not None and cached[0] > time.monotonic() and cached[1] == _snapshot_version:
+        headers.update({"ETag": _prices_etag(cached[1], key), "X-Cache": "HIT"})
+        return Response(content=cached[2], media_type="application/json", headers=headers)
+    
+    # Single-flight: одновременные одинаковые запросы ждут одного построения ответа
+    lock = _prices_cache_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        cached = _prices_cache.get(key)
+        now = time.monotonic()
+        if not force_refresh and cached is not None and cached[0] > now and cached[1] == _snapshot_version:
+            headers.update({"ETag": _prices_etag(cached[1], key), "X-Cache": "HIT"})
+            return Response(content=cached[2], media_type="application/json", headers=headers)
+        
+        body = orjson.dumps(await _build_crypto_prices(
+            limit, offset, sort_by, sort_order, search, timeframes, interval_configs,
+            after, skip_total, force_refresh
+        ))
+        # Версию читаем после построения: force_refresh мог обновить снимок
+        version = _snapshot_version
+        
+        _prune_prices_cache(now)
+        _prices_cache[key] = (time.monotonic() + PRICES_CACHE_TTL, version, body)
+    
+    headers.update({"ETag": _prices_etag(version, key), "X-Cache": "MISS"})
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _encode_cursor(after: Tuple[Optional[float], str]) -> str:
+    """Курсор страницы - ключ сортировки (значение, символ) последней отданной строки в base64url"""
+    return base64.urlsafe_b64encode(orjson.dumps(list(after))).decode()
+
+def _decode_cursor(cursor: str) -> Tuple[Optional[float], str]:
+    """Разобрать курсор страницы; некорректный курсор - ошибка 400"""
+    try:
+        value, symbol = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(symbol, str):
+            raise TypeError("cursor symbol must be a string")
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise TypeError("cursor value must be a number")
+        return (float(value) if value is not None else None), symbol
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def _build_crypto_prices(limit: int, offset: int, sort_by: str, sort_order: str,
+                               search: Optional[str], timeframes: str, interval_configs: str,
+                               after: Optional[Tuple[Optional[float], str]] = None, skip_total: bool = False,
+                               force_refresh: bool = False) -> Dict:
+    """Построить ответ /crypto/prices"""
+    global _current_iso_ts, _snapshot_version
     try:
-        # Парсим таймфреймы
-        tf_list = [tf.strip() for tf in timeframes.split(',') if tf.strip()]
-        if not tf_list:
-            tf_list = ['30s', '1m', '5m']  # По умолчанию
+        # Таймфреймы свечей и настраиваемые интервалы колонок (уже в секундах)
+        tf_list, interval_list, interval_seconds = parse_chart_params(timeframes, interval_configs)
         
-        # Парсим настраиваемые интервалы для колонок таблицы
-        interval_list = [interval.strip() for interval in interval_configs.split(',') if interval.strip()]
-        if len(interval_list) != 3:
-            interval_list = ['15s', '30s', '24h']  # По умолчанию 3 колонки
+        # Данные берем из снимка, который обновляет фоновая задача. К MEXC API
+        # обращаемся только до первого обновления или по явному force_refresh
+        snapshot = advanced_price_tracker.get_ticker_snapshot()
+        if force_refresh or snapshot is None or not snapshot.rows:
+            _, raw_data = await fetch_ticker_data(force_refresh)
+            snapshot = TickerSnapshot(parse_ticker_rows(raw_data))
+            advanced_price_tracker.update_ticker_snapshot(snapshot)
+            _current_iso_ts = datetime.utcnow().isoformat()
+            _snapshot_version += 1
+        rows = snapshot.rows
         
-        # Конвертируем интервалы в секунды
-        interval_seconds = [parse_interval_to_seconds(interval) for interval in interval_list]
+        # Одна метка времени на весь ответ - время обновления снимка
+        now_iso = _current_iso_ts or datetime.utcnow().isoformat()
         
-        # Получаем данные от MEXC API
-        raw_data = await optimized_mexc_service.get_filtered_tickers(SUPPORTED_TICKERS)
+        # Поиск, сортировка и пагинация в трекере - свечи собираются только для страницы.
+        # Порядок по полям MEXC уже посчитан в снимке
+        try:
+            page, tracked_data, total_available, next_after = advanced_price_tracker.get_page(
+                snapshot.symbols, snapshot.columns, snapshot.orders, tf_list, interval_seconds,
+                matches=snapshot.search(search) if search else None, sort_by=sort_by, sort_order=sort_order,
+                offset=offset, limit=limit, after=after
+            )
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
         
-        # Получаем данные из продвинутого трекера цен с настраиваемыми интервалами
-        tracked_data = advanced_price_tracker.get_symbols_batch_data(
-            list(raw_data.keys()), tf_list, interval_seconds
-        )
+        # Ключи данных трекера строим один раз на запрос, а не для каждого тикера
+        interval_keys = ('change_interval_0', 'change_interval_1', 'change_interval_2')
+        candle_keys = [f'candles_{tf}' for tf in tf_list]
         
-        # Форматируем данные
-        formatted_data = []
-        for symbol, ticker_data in raw_data.items():
-            # Базовые данные от MEXC (убираем change24h в долларах)
+        # Форматируем только тикеры страницы
+        result_data = {}
+        get_row = rows.__getitem__
+        get_tracked = tracked_data.get
+        for symbol in page:
+            row = get_row(symbol)
+            
+            # Базовые данные от MEXC (убираем change24h в долларах).
+            # Данные уже приведены к нужным типам - отдаем dict без валидации pydantic
             formatted_ticker = {
-                "symbol": ticker_data.get("symbol", symbol),
-                "price": float(ticker_data.get("lastPrice", 0)) if ticker_data.get("lastPrice") else 0,
-                "changePercent24h": float(ticker_data.get("priceChangePercent", 0)) if ticker_data.get("priceChangePercent") else 0,
-                "volume": float(ticker_data.get("volume", 0)) if ticker_data.get("volume") else 0,
-                "high24h": float(ticker_data.get("highPrice", 0)) if ticker_data.get("highPrice") else 0,
-                "low24h": float(ticker_data.get("lowPrice", 0)) if ticker_data.get("lowPrice") else 0,
-                "timestamp": datetime.utcnow().isoformat(),
+                "symbol": row.symbol,
+                "price": row.price,
+                "changePercent24h": row.change_percent,
+                "volume": row.volume,
+                "high24h": row.high,
+                "low24h": row.low,
+                "timestamp": now_iso,
                 "source": "mexc",
+                "change_15s": None,
+                "change_30s": None,
+                "change_interval_0": None,
+                "change_interval_1": None,
+                "change_interval_2": None,
+                "candles": [],
                 "interval_configs": interval_list  # Возвращаем конфигурацию интервалов
             }
             
             # Дополняем данными из трекера
-            if symbol in tracked_data:
-                track_data = tracked_data[symbol]
-                formatted_ticker.update({
-                    "change_15s": track_data.get("change_15s"),
-                    "change_30s": track_data.get("change_30s"),
-                })
+            track_data = get_tracked(symbol)
+            if track_data is not None:
+                td_get = track_data.get
+                formatted_ticker["change_15s"] = td_get("change_15s")
+                formatted_ticker["change_30s"] = td_get("change_30s")
                 
                 # Добавляем настраиваемые интервалы
-                for i in range(3):
-                    if f'change_interval_{i}' in track_data:
-                        formatted_ticker[f'change_interval_{i}'] = track_data[f'change_interval_{i}']
+                for key in interval_keys:
+                    if key in track_data:
+                        formatted_ticker[key] = track_data[key]
                 
                 # Добавляем свечи для всех запрошенных таймфреймов
                 candles = []
-                for tf in tf_list:
-                    tf_candles = track_data.get(f'candles_{tf}', [])
-                    candles.extend(tf_candles)
+                for key in candle_keys:
+                    candles.extend(td_get(key, ()))
                 formatted_ticker["candles"] = candles
             
-            formatted_data.append((symbol, CryptoPrice(**formatted_ticker)))
+            result_data[symbol] = formatted_ticker
         
-        # Применяем поиск
-        if search:
-            search_upper = search.upper()
-            formatted_data = [
-                (symbol, data) for symbol, data in formatted_data 
-                if search_upper in symbol or search_upper in symbol.replace('USDT', '')
-            ]
-        
-        # Сортировка
-        sort_key_map = {
-            "symbol": lambda x: x[1].symbol,
-            "price": lambda x: x[1].price,
-            "changePercent24h": lambda x: x[1].changePercent24h,
-            "volume": lambda x: x[1].volume,
-            "change_15s": lambda x: x[1].change_15s.percent_change if x[1].change_15s else 0,
-            "change_30s": lambda x: x[1].change_30s.percent_change if x[1].change_30s else 0,
+        response = {
+            "data": result_data,
+            "timestamp": now_iso,
+            "count": len(result_data),
+            "next_cursor": _encode_cursor(next_after) if next_after is not None else None
         }
-        
-        # Добавляем поддержку сортировки по настраиваемым интервалам
-        for i in range(3):
-            sort_key_map[f'change_interval_{i}'] = lambda x, idx=i: getattr(x[1], f'change_interval_{idx}').percent_change if hasattr(x[1], f'change_interval_{idx}') and getattr(x[1], f'change_interval_{idx}') else 0
-        
-        if sort_by in sort_key_map:
-            formatted_data.sort(
-                key=sort_key_map[sort_by], 
-                reverse=(sort_order.lower() == "desc")
-            )
-        
-        # Пагинация
-        total_available = len(formatted_data)
-        paginated_data = formatted_data[offset:offset + limit]
-        
-        # Формируем финальный ответ
-        result_data = {symbol: data for symbol, data in paginated_data}
-        
-        response = CryptoPricesResponse(
-            data=result_data,
-            timestamp=datetime.utcnow().isoformat(),
-            count=len(result_data),
-            total_available=total_available
-        )
-        
+        if not skip_total:
+            response["total_available"] = total_available
         return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error fetching crypto prices: {str(e)}")
         raise HTTPException(
@@ -302,7 +549,7 @@ async def load_history():
         from services.historical_data_service import load_historical_data_for_all_tickers
         
         # Запускаем загрузку исторических данных в фоновом режиме
-        asyncio.create_task(load_historical_data_for_all_tickers())
+        _spawn(load_historical_data_for_all_tickers())
         
         return {
             "status": "started",
@@ -341,16 +588,45 @@ async def get_history_status():
             "current_symbol": "",
             "timestamp": datetime.utcnow().isoformat()
         }
+
 async def create_status_check(input: StatusCheckCreate):
-    status_dict = input.dict()
-    status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
-    return status_obj
+    # Входные данные уже проверены StatusCheckCreate - собираем документ без повторной валидации
+    status_check = StatusCheck.model_construct(
+        id=str(uuid.uuid4()), client_name=input.client_name, timestamp=datetime.utcnow()
+    ).model_dump()
+    await db.status_checks.insert_one(status_check)
+    status_check.pop("_id", None)  # insert_one дописывает _id в документ
+    return status_check
 
-@api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+@api_router.get("/status", responses={200: {"model": List[StatusCheck]}})
+async def get_status_checks(
+    limit: int = Query(default=50, ge=1, le=200, description="Number of status checks to return"),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor header of the previous page")
+):
+    """
+    Получить проверки статуса, новые первыми.
+    Если есть следующая страница, ее курсор возвращается в заголовке X-Next-Cursor.
+    """
+    query = {}
+    if cursor:
+        try:
+            query = {"_id": {"$lt": ObjectId(cursor)}}
+        except (InvalidId, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    projection = {"_id": 1, "id": 1, "client_name": 1, "timestamp": 1}
+    status_checks = await db.status_checks.find(query, projection).sort("_id", -1).limit(limit).to_list(limit)
+    
+    headers = {}
+    if len(status_checks) == limit:
+        headers["X-Next-Cursor"] = str(status_checks[-1]["_id"])
+    
+    # Документы из своей же коллекции - собираем модели без повторной валидации
+    data = [
+        StatusCheck.model_construct(**{k: v for k, v in status_check.items() if k != "_id"}).model_dump()
+        for status_check in status_checks
+    ]
+    return ORJSONResponse(data, headers=headers)
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -361,14 +637,11 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+# Ответы /crypto/prices со свечами весят десятки КБ и хорошо сжимаются
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
 @app.on_event("startup")
 async def startup_event():
@@ -377,19 +650,20 @@ async def startup_event():
     logger.info(f"Configured {len(SUPPORTED_TICKERS)} tickers with advanced tracking")
     
     # Запускаем фоновую задачу сбора данных
-    asyncio.create_task(background_price_collection())
+    _spawn(background_price_collection())
     
     # Планируем очистку старых данных каждые 15 минут
     async def cleanup_task():
         while True:
             await asyncio.sleep(900)  # 15 минут
             try:
-                advanced_price_tracker.cleanup_old_data()
+                # Очистка - чистая CPU-работа, выполняем ее вне event loop
+                await asyncio.get_running_loop().run_in_executor(None, advanced_price_tracker.cleanup_old_data)
                 logger.info("Advanced data cleanup completed")
             except Exception as e:
-                logger.error(f"Error during cleanup: {str(e)}")
+                logger.error("Error during cleanup: %s", e)
     
-    asyncio.create_task(cleanup_task())
+    _spawn(cleanup_task())
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -398,5 +672,13 @@ async def shutdown_event():
     background_task_running = False
     
     logger.info("MEXC TradingView Screener API v3.0 shutting down...")
-    await optimized_mexc_service.close_session()
-    client.close()
\ No newline at end of file
+    
+    # Останавливаем фоновые задачи до закрытия ресурсов, которыми они пользуются
+    tasks = list(_bg_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    
+    await close_shared_session()
+    await redis_ticker_cache.close()
+    await client.close()
\ No newline at end of file
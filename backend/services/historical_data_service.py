@@ -1,43 +1,29 @@
-import aiohttp
 import asyncio
 import logging
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
-import json
+from typing import Dict, List, Tuple
+from datetime import datetime
+import numpy as np
+import orjson
+from services.http import get_shared_session
 
 logger = logging.getLogger(__name__)
 
 class HistoricalDataService:
     """Сервис для загрузки исторических данных с MEXC API"""
     
+    # Таймфреймы, которые есть на MEXC: (наш таймфрейм, интервал MEXC).
+    # 15s и 30s MEXC не поддерживает - они строятся только из живых цен
+    SUPPORTED_PAIRS: Tuple[Tuple[str, str], ...] = (
+        ('1m', '1m'),
+        ('5m', '5m'),
+        ('15m', '15m'),
+        ('1h', '1h'),
+        ('4h', '4h'),
+        ('1d', '1d'),
+    )
+    
     def __init__(self):
         self.base_url = "https://api.mexc.com"
-        self.session: Optional[aiohttp.ClientSession] = None
-        
-        # Маппинг наших таймфреймов к MEXC интервалам
-        self.timeframe_mapping = {
-            '15s': None,  # MEXC не поддерживает 15s
-            '30s': None,  # MEXC не поддерживает 30s  
-            '1m': '1m',
-            '5m': '5m',
-            '15m': '15m',
-            '1h': '1h',
-            '4h': '4h',
-            '1d': '1d'
-        }
-    
-    async def get_session(self) -> aiohttp.ClientSession:
-        """Получить или создать HTTP сессию"""
-        if self.session is None or self.session.closed:
-            timeout = aiohttp.ClientTimeout(total=30)
-            connector = aiohttp.TCPConnector(limit=50, limit_per_host=10)
-            self.session = aiohttp.ClientSession(timeout=timeout, connector=connector)
-        return self.session
-    
-    async def close_session(self):
-        """Закрыть HTTP сессию"""
-        if self.session and not self.session.closed:
-            await self.session.close()
     
     async def fetch_historical_klines(self, symbol: str, interval: str, limit: int = 100) -> List[Dict]:
         """
@@ -52,7 +38,7 @@ class HistoricalDataService:
             Список словарей с данными свечей
         """
         try:
-            session = await self.get_session()
+            session = await get_shared_session()
             url = f"{self.base_url}/api/v3/klines"
             
             params = {
@@ -65,26 +51,10 @@ class HistoricalDataService:
             
             async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    raw_data = await response.json()
+                    # orjson разбирает байты ответа напрямую, без промежуточной декодировки в str
+                    raw_data = orjson.loads(await response.read())
                     
-                    # Конвертируем данные MEXC в наш формат
-                    candles = []
-                    for kline in raw_data:
-                        if len(kline) >= 11:
-                            candle = {
-                                'open': float(kline[1]),
-                                'high': float(kline[2]), 
-                                'low': float(kline[3]),
-                                'close': float(kline[4]),
-                                'volume': float(kline[5]),
-                                'open_time': int(kline[0]),
-                                'close_time': int(kline[6]),
-                                'start_time': datetime.fromtimestamp(int(kline[0]) / 1000).isoformat(),
-                                'end_time': datetime.fromtimestamp(int(kline[6]) / 1000).isoformat(),
-                                'timestamp': int(kline[0]),
-                                'timeframe': self._mexc_interval_to_timeframe(interval)
-                            }
-                            candles.append(candle)
+                    candles = self._parse_klines(raw_data, self._mexc_interval_to_timeframe(interval))
                     
                     logger.info(f"Fetched {len(candles)} historical candles for {symbol} {interval}")
                     return candles
@@ -98,6 +68,40 @@ class HistoricalDataService:
             logger.error(f"Error in fetch_historical_klines for {symbol} {interval}: {str(e)}")
             return []
     
+    @staticmethod
+    def _parse_klines(raw_data: List[List], timeframe: str) -> List[Dict]:
+        """
+        Конвертировать klines MEXC в наш формат свечей.
+        
+        Время хранится только в миллисекундах (open_time, close_time, timestamp);
+        ISO-строки при необходимости строятся из них при сериализации.
+        Приведение типов выполняется по столбцам в NumPy, в Python остается
+        только сборка итоговых словарей.
+        """
+        rows = [kline[:7] for kline in raw_data if len(kline) >= 11]
+        if not rows:
+            return []
+        
+        arr = np.asarray(rows, dtype=object)
+        ohlcv = arr[:, 1:6].astype(np.float64).tolist()
+        open_times = arr[:, 0].astype(np.int64).tolist()
+        close_times = arr[:, 6].astype(np.int64).tolist()
+        
+        return [
+            {
+                'open': o,
+                'high': h,
+                'low': l,
+                'close': c,
+                'volume': v,
+                'open_time': open_time,
+                'close_time': close_time,
+                'timestamp': open_time,
+                'timeframe': timeframe
+            }
+            for (o, h, l, c, v), open_time, close_time in zip(ohlcv, open_times, close_times)
+        ]
+    
     def _mexc_interval_to_timeframe(self, mexc_interval: str) -> str:
         """Конвертировать MEXC интервал в наш таймфрейм"""
         mapping = {
@@ -110,13 +114,15 @@ class HistoricalDataService:
         }
         return mapping.get(mexc_interval, mexc_interval)
     
-    async def load_historical_data_for_symbols(self, symbols: List[str], timeframes: List[str] = None) -> Dict[str, Dict[str, List[Dict]]]:
+    async def load_historical_data_for_symbols(self, symbols: List[str], timeframes: List[str] = None,
+                                               max_concurrency: int = 20) -> Dict[str, Dict[str, List[Dict]]]:
         """
         Загрузить исторические данные для списка символов и таймфреймов
         
         Args:
             symbols: Список символов для загрузки
             timeframes: Список наших таймфреймов (если None, используем стандартные)
+            max_concurrency: Максимум одновременных запросов к MEXC
             
         Returns:
             Dict в формате {symbol: {timeframe: [candles]}}
@@ -125,40 +131,38 @@ class HistoricalDataService:
             timeframes = ['1m', '5m', '15m', '1h', '4h', '1d']
         
         # Фильтруем только поддерживаемые MEXC таймфреймы
-        supported_timeframes = [tf for tf in timeframes if self.timeframe_mapping.get(tf)]
+        requested = set(timeframes)
+        pairs = [(timeframe, mexc_interval) for timeframe, mexc_interval in self.SUPPORTED_PAIRS if timeframe in requested]
         
-        logger.info(f"Loading historical data for {len(symbols)} symbols and {len(supported_timeframes)} timeframes")
+        logger.info(f"Loading historical data for {len(symbols)} symbols and {len(pairs)} timeframes")
         
         result = {}
-        tasks = []
-        
-        # Создаем задачи для параллельной загрузки
-        for symbol in symbols:
-            for timeframe in supported_timeframes:
-                mexc_interval = self.timeframe_mapping[timeframe]
-                if mexc_interval:
-                    task = self._load_symbol_timeframe(symbol, timeframe, mexc_interval)
-                    tasks.append(task)
-        
-        # Выполняем все задачи параллельно батчами
-        batch_size = 20  # Ограничиваем количество одновременных запросов
-        for i in range(0, len(tasks), batch_size):
-            batch = tasks[i:i + batch_size]
-            batch_results = await asyncio.gather(*batch, return_exceptions=True)
-            
-            # Обрабатываем результаты батча
-            for task_result in batch_results:
-                if isinstance(task_result, Exception):
-                    logger.error(f"Batch task failed: {str(task_result)}")
-                elif task_result:
-                    symbol, timeframe, candles = task_result
-                    if symbol not in result:
-                        result[symbol] = {}
-                    result[symbol][timeframe] = candles
+        
+        # Не больше max_concurrency запросов одновременно: завершившийся запрос сразу
+        # освобождает место следующему, без ожидания самого медленного в батче
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def guarded(symbol: str, timeframe: str, mexc_interval: str) -> tuple:
+            async with semaphore:
+                return await self._load_symbol_timeframe(symbol, timeframe, mexc_interval)
+        
+        tasks = [
+            asyncio.create_task(guarded(symbol, timeframe, mexc_interval))
+            for symbol in symbols
+            for timeframe, mexc_interval in pairs
+        ]
+        
+        # Разбираем результаты по мере готовности, не дожидаясь всех запросов
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                task_result = await next_done
+            except Exception as e:
+                logger.error(f"Load task failed: {str(e)}")
+                continue
             
-            # Небольшая задержка между батчами
-            if i + batch_size < len(tasks):
-                await asyncio.sleep(0.1)
+            if task_result:
+                symbol, timeframe, candles = task_result
+                result.setdefault(symbol, {})[timeframe] = candles
         
         logger.info(f"Historical data loading completed. Loaded data for {len(result)} symbols")
         return result
@@ -0,0 +1,41 @@
+import logging
+from typing import Optional
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Общая HTTP сессия для всех сервисов MEXC: один пул keep-alive соединений,
+# один DNS-кэш и одно TLS-рукопожатие на соединение вместо отдельных сессий в каждом сервисе
+_session: Optional[aiohttp.ClientSession] = None
+
+async def get_shared_session() -> aiohttp.ClientSession:
+    """Получить или создать общую HTTP сессию"""
+    global _session
+    # Между проверкой и созданием нет await, поэтому одновременные первые вызовы
+    # в одном event loop не могут создать две сессии; блокировка не нужна,
+    # пока сюда не добавлено ожидание (при его появлении - защитить asyncio.Lock)
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=200,  # Максимум одновременных подключений
+            limit_per_host=50,
+            ttl_dns_cache=300,
+            use_dns_cache=True,
+            keepalive_timeout=60,
+        )
+        _session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=30, connect=10),
+            connector=connector,
+            # Буфер чтения 1 МБ вместо 64 КБ: крупные ответы MEXC читаются без пауз на мелких чанках
+            read_bufsize=1 << 20,
+            headers={
+                'User-Agent': 'MEXC-Crypto-Screener/1.0'
+            }
+        )
+    return _session
+
+async def close_shared_session():
+    """Закрыть общую HTTP сессию (при остановке приложения)"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
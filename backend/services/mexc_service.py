@@ -1,27 +1,20 @@
 import aiohttp
-import asyncio
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+import time
+from services.http import get_shared_session
 
 logger = logging.getLogger(__name__)
 
 class MEXCService:
     def __init__(self):
         self.base_url = "https://api.mexc.com"
-        self.session: Optional[aiohttp.ClientSession] = None
-    
-    async def get_session(self) -> aiohttp.ClientSession:
-        """Получить или создать HTTP сессию"""
-        if self.session is None or self.session.closed:
-            timeout = aiohttp.ClientTimeout(total=10)
-            self.session = aiohttp.ClientSession(timeout=timeout)
-        return self.session
-    
-    async def close_session(self):
-        """Закрыть HTTP сессию"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        self.timeout = aiohttp.ClientTimeout(total=10)
+        
+        # Кэш ответа со всеми тикерами: (время получения по time.monotonic, {symbol: data})
+        self.bulk_cache_ttl = 2.0
+        self._bulk_cache: Optional[Tuple[float, Dict[str, Dict]]] = None
     
     async def get_24hr_ticker(self, symbol: Optional[str] = None) -> Dict:
         """
@@ -34,14 +27,14 @@ class MEXCService:
             Dict с данными о цене и изменениях за 24 часа
         """
         try:
-            session = await self.get_session()
+            session = await get_shared_session()
             url = f"{self.base_url}/api/v3/ticker/24hr"
             
             params = {}
             if symbol:
                 params['symbol'] = symbol
             
-            async with session.get(url, params=params) as response:
+            async with session.get(url, params=params, timeout=self.timeout) as response:
                 if response.status == 200:
                     data = await response.json()
                     logger.info(f"Successfully fetched 24hr ticker data for {'all symbols' if not symbol else symbol}")
@@ -66,14 +59,14 @@ class MEXCService:
             Dict с текущими ценами
         """
         try:
-            session = await self.get_session()
+            session = await get_shared_session()
             url = f"{self.base_url}/api/v3/ticker/price"
             
             params = {}
             if symbol:
                 params['symbol'] = symbol
             
-            async with session.get(url, params=params) as response:
+            async with session.get(url, params=params, timeout=self.timeout) as response:
                 if response.status == 200:
                     data = await response.json()
                     logger.info(f"Successfully fetched price data for {'all symbols' if not symbol else symbol}")
@@ -87,6 +80,23 @@ class MEXCService:
             logger.error(f"Error in get_current_price: {str(e)}")
             raise
     
+    async def get_all_24hr_tickers(self) -> Dict[str, Dict]:
+        """
+        Получить 24-часовую статистику всех символов одним запросом.
+        Ответ кэшируется на bulk_cache_ttl секунд.
+        
+        Returns:
+            Dict где ключи - символы, значения - данные о ценах
+        """
+        now = time.monotonic()
+        if self._bulk_cache is not None and now - self._bulk_cache[0] < self.bulk_cache_ttl:
+            return self._bulk_cache[1]
+        
+        data = await self.get_24hr_ticker()
+        tickers = {item["symbol"]: item for item in data if item.get("symbol")} if isinstance(data, list) else {}
+        self._bulk_cache = (now, tickers)
+        return tickers
+    
     async def get_multiple_tickers(self, symbols: List[str]) -> Dict[str, Dict]:
         """
         Получить данные для нескольких тикеров одновременно
@@ -97,49 +107,51 @@ class MEXCService:
         Returns:
             Dict где ключи - символы, значения - данные о ценах
         """
+        # Один запрос со всеми тикерами вместо отдельного запроса на каждый символ
         try:
-            # Создаем задачи для параллельного выполнения запросов
-            tasks = []
-            for symbol in symbols:
-                task = self.get_24hr_ticker(symbol)
-                tasks.append(task)
-            
-            # Выполняем все запросы параллельно
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Обрабатываем результаты
-            tickers_data = {}
-            for i, result in enumerate(results):
-                symbol = symbols[i]
-                if isinstance(result, Exception):
-                    logger.error(f"Error fetching data for {symbol}: {str(result)}")
-                    # Используем заглушку для ошибочных символов
-                    tickers_data[symbol] = {
-                        "symbol": symbol,
-                        "lastPrice": "0",
-                        "priceChange": "0", 
-                        "priceChangePercent": "0",
-                        "error": str(result)
-                    }
-                else:
-                    tickers_data[symbol] = result
-            
-            return tickers_data
-            
+            all_tickers = await self.get_all_24hr_tickers()
+            error = "not_found"
         except Exception as e:
-            logger.error(f"Error in get_multiple_tickers: {str(e)}")
-            raise
+            logger.error(f"Error fetching bulk ticker data: {str(e)}")
+            all_tickers = {}
+            error = str(e)
+        
+        tickers_data = {}
+        for symbol in symbols:
+            ticker = all_tickers.get(symbol)
+            if ticker is not None:
+                tickers_data[symbol] = ticker
+            else:
+                # Используем заглушку для ошибочных символов
+                tickers_data[symbol] = {
+                    "symbol": symbol,
+                    "lastPrice": "0",
+                    "priceChange": "0", 
+                    "priceChangePercent": "0",
+                    "error": error
+                }
+        
+        return tickers_data
     
-    def format_ticker_data(self, raw_data: Dict) -> Dict:
+    def format_tickers(self, raw_rows: List[Dict]) -> List[Dict]:
+        """Форматировать пачку тикеров с одной общей меткой времени"""
+        timestamp = datetime.utcnow().isoformat()
+        return [self.format_ticker_data(raw_data, timestamp) for raw_data in raw_rows]
+    
+    def format_ticker_data(self, raw_data: Dict, timestamp: Optional[str] = None) -> Dict:
         """
         Форматировать данные тикера для frontend
         
         Args:
             raw_data: Сырые данные от MEXC API
+            timestamp: Метка времени ISO (по умолчанию - текущее время)
             
         Returns:
             Отформатированные данные
         """
+        if timestamp is None:
+            timestamp = datetime.utcnow().isoformat()
+        
         try:
             return {
                 "symbol": raw_data.get("symbol", ""),
@@ -149,7 +161,7 @@ class MEXCService:
                 "volume": float(raw_data.get("volume", 0)),
                 "high24h": float(raw_data.get("highPrice", 0)),
                 "low24h": float(raw_data.get("lowPrice", 0)),
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": timestamp,
                 "source": "mexc"
             }
         except (ValueError, TypeError) as e:
@@ -162,7 +174,7 @@ class MEXCService:
                 "volume": 0,
                 "high24h": 0,
                 "low24h": 0,
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": timestamp,
                 "source": "mexc",
                 "error": "formatting_error"
             }
@@ -1,74 +1,223 @@
-import aiohttp
 import asyncio
 import logging
-from typing import Dict, List, Optional, Tuple
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
-import json
+import orjson
+import numpy as np
+from services.http import get_shared_session
 
 logger = logging.getLogger(__name__)
 
+def safe_float(value, default: float = 0.0) -> float:
+    """Строковое число MEXC как float; пустое, "0" или некорректное значение дает default"""
+    try:
+        return float(value) if value and value != "0" else default
+    except (ValueError, TypeError):
+        return default
+
+def _f(data: Dict, key: str) -> float:
+    """Прочитать числовое поле MEXC (строка) как float; пустое значение дает 0"""
+    value = data.get(key)
+    return float(value) if value else 0.0
+
+def _parse_tickers_body(body: bytes) -> Dict[str, Dict]:
+    """Разобрать ответ /api/v3/ticker/24hr в словарь {symbol: data}"""
+    # orjson разбирает байты ответа напрямую, без промежуточной декодировки в str
+    data = orjson.loads(body)
+    
+    # Преобразуем список в словарь для быстрого доступа
+    tickers_dict = {}
+    if isinstance(data, list):
+        for ticker_data in data:
+            symbol = ticker_data.get('symbol', '')
+            if symbol:
+                tickers_dict[symbol] = ticker_data
+    return tickers_dict
+
+class TickerRow:
+    """24h данные тикера, разобранные из ответа MEXC один раз за обновление"""
+    
+    __slots__ = ('symbol', 'price', 'change_percent', 'volume', 'high', 'low', 'error')
+    
+    def __init__(self, symbol: str, data: Dict):
+        self.symbol = data.get("symbol") or symbol
+        self.error = data.get("error")
+        try:
+            self.price = _f(data, "lastPrice")
+            self.change_percent = _f(data, "priceChangePercent")
+            self.volume = _f(data, "volume")
+            self.high = _f(data, "highPrice")
+            self.low = _f(data, "lowPrice")
+        except (ValueError, TypeError):
+            self.price = self.change_percent = self.volume = self.high = self.low = 0.0
+            self.error = "formatting_error"
+    
+    @classmethod
+    def from_values(cls, symbol: str, data: Dict, price: float, change_percent: float,
+                    volume: float, high: float, low: float) -> "TickerRow":
+        """Создать строку из уже разобранных чисел (без повторного float())"""
+        row = cls.__new__(cls)
+        row.symbol = data.get("symbol") or symbol
+        row.error = data.get("error")
+        row.price = price
+        row.change_percent = change_percent
+        row.volume = volume
+        row.high = high
+        row.low = low
+        return row
+
+# Числовые поля MEXC в порядке аргументов TickerRow.from_values
+TICKER_NUMERIC_FIELDS = ("lastPrice", "priceChangePercent", "volume", "highPrice", "lowPrice")
+
+def parse_ticker_rows(tickers: Dict[str, Dict]) -> Dict[str, TickerRow]:
+    """
+    Разобрать сырые данные тикеров {symbol: raw_data} в {symbol: TickerRow}.
+    
+    Строки чисел переводятся в float поколоночно средствами NumPy; если в данных
+    есть нечисловое значение, разбираем построчно, помечая только ошибочные тикеры.
+    """
+    symbols = list(tickers)
+    raw_rows = list(tickers.values())
+    try:
+        columns = [
+            np.array([data.get(field) or "0" for data in raw_rows], dtype=np.float64).tolist()
+            for field in TICKER_NUMERIC_FIELDS
+        ]
+    except (ValueError, TypeError):
+        return {symbol: TickerRow(symbol, data) for symbol, data in tickers.items()}
+    
+    from_values = TickerRow.from_values
+    return {
+        symbol: from_values(symbol, data, *values)
+        for symbol, data, values in zip(symbols, raw_rows, zip(*columns))
+    }
+
+def ticker_columns(rows: List[TickerRow]) -> Dict[str, np.ndarray]:
+    """
+    Числовые колонки для сортировки в виде массивов float64
+    
+    Returns:
+        Dict {имя поля ответа: np.ndarray}, порядок элементов совпадает с rows
+    """
+    count = len(rows)
+    return {
+        "price": np.fromiter((row.price for row in rows), dtype=np.float64, count=count),
+        "changePercent24h": np.fromiter((row.change_percent for row in rows), dtype=np.float64, count=count),
+        "volume": np.fromiter((row.volume for row in rows), dtype=np.float64, count=count)
+    }
+
+class TickerSnapshot:
+    """
+    Снимок тикеров для /crypto/prices: разобранные строки, числовые колонки и
+    заранее отсортированные индексы. Строится фоновой задачей один раз за
+    обновление и после создания не изменяется, поэтому читается без lock.
+    """
+    
+    __slots__ = ('rows', 'symbols', 'columns', 'orders', 'search_keys')
+    
+    # Разделитель частей ключа поиска; в символах MEXC не встречается
+    SEARCH_SEPARATOR = "\n"
+    
+    def __init__(self, rows: Dict[str, TickerRow]):
+        self.rows = rows
+        self.symbols = list(rows)
+        self.columns = ticker_columns(list(rows.values()))
+        
+        # Ключ поиска "SYMBOL\nSYMBOL без USDT": одна проверка подстроки на символ
+        # вместо symbol.replace('USDT', '') на каждый запрос
+        self.search_keys = [
+            f"{symbol}{self.SEARCH_SEPARATOR}{symbol.replace('USDT', '')}" for symbol in self.symbols
+        ]
+        
+        # Индексы symbols для каждой пары (поле, desc). Равные значения упорядочены
+        # по символу, а убывающий порядок - точный обратный возрастающему: позиция
+        # строки однозначно задается парой (значение, символ), по ней ищется курсор страницы
+        by_symbol = np.array(sorted(range(len(self.symbols)), key=self.symbols.__getitem__), dtype=np.intp)
+        symbol_rank = np.empty(len(by_symbol), dtype=np.intp)
+        symbol_rank[by_symbol] = np.arange(len(by_symbol))
+        self.orders: Dict[Tuple[str, bool], np.ndarray] = {
+            ("symbol", False): by_symbol,
+            ("symbol", True): by_symbol[::-1]
+        }
+        for name, values in self.columns.items():
+            ascending = np.lexsort((symbol_rank, values))
+            self.orders[(name, False)] = ascending
+            self.orders[(name, True)] = ascending[::-1]
+
+    def search(self, query: str) -> np.ndarray:
+        """Индексы символов, содержащих query (в том числе без суффикса USDT), в исходном порядке"""
+        query = query.upper()
+        if self.SEARCH_SEPARATOR in query:
+            return np.empty(0, dtype=np.intp)
+        return np.array([i for i, key in enumerate(self.search_keys) if query in key], dtype=np.intp)
+
 class OptimizedMEXCService:
     def __init__(self):
         self.base_url = "https://api.mexc.com"
-        self.session: Optional[aiohttp.ClientSession] = None
         self.rate_limit_delay = 0.1  # 100ms между запросами
+        # Запросы к MEXC, выполняющиеся прямо сейчас: {ключ: задача запроса}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Символы, которых нет на MEXC: {symbol: (время истечения по time.monotonic, заглушка)}
+        self.not_found_ttl = 300.0
+        self._not_found_cache: Dict[str, Tuple[float, Dict]] = {}
         
-    async def get_session(self) -> aiohttp.ClientSession:
-        """Получить или создать HTTP сессию с оптимизированными настройками"""
-        if self.session is None or self.session.closed:
-            timeout = aiohttp.ClientTimeout(total=30, connect=10)
-            connector = aiohttp.TCPConnector(
-                limit=100,  # Максимум одновременных подключений
-                limit_per_host=20,
-                ttl_dns_cache=300,
-                use_dns_cache=True,
-            )
-            self.session = aiohttp.ClientSession(
-                timeout=timeout,
-                connector=connector,
-                headers={
-                    'User-Agent': 'MEXC-Crypto-Screener/1.0'
-                }
-            )
-        return self.session
+    async def _fetch_once(self, key: str, fetch: Callable[[], Awaitable]):
+        """
+        Single-flight: пока запрос с данным ключом выполняется, остальные вызывающие
+        ждут его результат вместо того, чтобы отправлять свой запрос к MEXC
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            # Запрос - отдельная задача, не принадлежащая ни одному вызывающему:
+            # отмена того, кто его начал, не отменяет запрос для остальных
+            task = asyncio.create_task(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._fetch_done(key, done))
+        
+        # shield - отмена одного из ожидающих (в том числе первого) не отменяет общий запрос
+        return await asyncio.shield(task)
     
-    async def close_session(self):
-        """Закрыть HTTP сессию"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+    def _fetch_done(self, key: str, task: asyncio.Task):
+        """Убрать завершенный запрос из _inflight"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Помечаем исключение как полученное, если ожидающих не осталось
     
     async def get_all_24hr_tickers(self) -> Dict[str, Dict]:
         """
-        Получить все 24-часовые данные одним запросом (наиболее эффективно)
+        Получить все 24-часовые данные одним запросом (наиболее эффективно).
+        Одновременные вызовы объединяются в один запрос к MEXC.
         """
+        return await self._fetch_once("tickers_all", self._fetch_all_24hr_tickers)
+    
+    async def _fetch_all_24hr_tickers(self) -> Dict[str, Dict]:
+        """Запросить все 24-часовые данные у MEXC"""
         try:
-            session = await self.get_session()
+            session = await get_shared_session()
             url = f"{self.base_url}/api/v3/ticker/24hr"
             
             logger.info("Fetching all 24hr ticker data in single request...")
             
             async with session.get(url) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    body = await response.read()
                     
-                    # Преобразуем список в словарь для быстрого доступа
-                    tickers_dict = {}
-                    if isinstance(data, list):
-                        for ticker_data in data:
-                            symbol = ticker_data.get('symbol', '')
-                            if symbol:
-                                tickers_dict[symbol] = ticker_data
+                    # Разбор прямо в event loop: orjson держит GIL, и пул потоков добавил бы
+                    # только задержку переключения (около 2.5 мс на ~2500 тикеров раз за тик)
+                    tickers_dict = _parse_tickers_body(body)
                     
-                    logger.info(f"Successfully fetched {len(tickers_dict)} tickers from MEXC")
+                    logger.info("Successfully fetched %d tickers from MEXC", len(tickers_dict))
                     return tickers_dict
                     
                 else:
                     error_text = await response.text()
-                    logger.error(f"Error fetching all tickers: {response.status} - {error_text}")
+                    logger.error("Error fetching all tickers: %s - %s", response.status, error_text)
                     raise Exception(f"HTTP {response.status}: {error_text}")
                     
         except Exception as e:
-            logger.error(f"Error in get_all_24hr_tickers: {str(e)}")
+            logger.error("Error in get_all_24hr_tickers: %s", e)
             raise
     
     async def get_filtered_tickers(self, target_symbols: List[str]) -> Dict[str, Dict]:
@@ -82,32 +231,44 @@ class OptimizedMEXCService:
             # Фильтруем только нужные символы
             filtered_data = {}
             not_found = []
+            not_found_cache = self._not_found_cache
+            now = time.monotonic()
             
             for symbol in target_symbols:
-                if symbol in all_data:
-                    filtered_data[symbol] = all_data[symbol]
-                else:
-                    not_found.append(symbol)
-                    # Создаем заглушку для отсутствующих символов
-                    filtered_data[symbol] = {
-                        "symbol": symbol,
-                        "lastPrice": "0",
-                        "priceChange": "0",
-                        "priceChangePercent": "0",
-                        "volume": "0",
-                        "highPrice": "0",
-                        "lowPrice": "0",
-                        "error": "not_found"
-                    }
+                data = all_data.get(symbol)
+                if data is not None:
+                    filtered_data[symbol] = data
+                    continue
+                
+                cached = not_found_cache.get(symbol)
+                if cached is not None and cached[0] > now:
+                    # Уже известно, что символа нет: та же заглушка, без повторного предупреждения
+                    filtered_data[symbol] = cached[1]
+                    continue
+                
+                not_found.append(symbol)
+                # Создаем заглушку для отсутствующих символов
+                stub = {
+                    "symbol": symbol,
+                    "lastPrice": "0",
+                    "priceChange": "0",
+                    "priceChangePercent": "0",
+                    "volume": "0",
+                    "highPrice": "0",
+                    "lowPrice": "0",
+                    "error": "not_found"
+                }
+                not_found_cache[symbol] = (now + self.not_found_ttl, stub)
+                filtered_data[symbol] = stub
             
             if not_found:
-                logger.warning(f"Symbols not found on MEXC: {', '.join(not_found[:10])}{'...' if len(not_found) > 10 else ''}")
+                logger.warning("Symbols not found on MEXC: %s%s", ', '.join(not_found[:10]), '...' if len(not_found) > 10 else '')
             
-            logger.info(f"Filtered {len(filtered_data)} symbols from MEXC data")
+            logger.info("Filtered %d symbols from MEXC data", len(filtered_data))
             return filtered_data
             
         except Exception as e:
-            logger.error(f"Error in get_filtered_tickers: {str(e)}")
+            logger.error("Error in get_filtered_tickers: %s", e)
             # Возвращаем заглушки для всех символов в случае ошибки
             return {
                 symbol: {
@@ -123,10 +284,45 @@ class OptimizedMEXCService:
                 for symbol in target_symbols
             }
     
-    def format_ticker_data(self, raw_data: Dict) -> Dict:
+    def format_tickers(self, raw_rows: List[Dict]) -> List[Dict]:
+        """
+        Форматировать пачку тикеров с одной общей меткой времени.
+        
+        Основной случай (тикер без ошибки) развернут прямо в цикле с локальными
+        ссылками на функции, без вызова format_ticker_data на каждую строку.
+        """
+        timestamp = datetime.utcnow().isoformat()
+        sf = safe_float
+        formatted = []
+        append = formatted.append
+        
+        for raw_data in raw_rows:
+            if "error" in raw_data:
+                append(self.format_ticker_data(raw_data, timestamp))
+                continue
+            
+            get = raw_data.get
+            append({
+                "symbol": get("symbol", ""),
+                "price": sf(get("lastPrice")),
+                "change24h": sf(get("priceChange")),
+                "changePercent24h": sf(get("priceChangePercent")),
+                "volume": sf(get("volume")),
+                "high24h": sf(get("highPrice")),
+                "low24h": sf(get("lowPrice")),
+                "timestamp": timestamp,
+                "source": "mexc"
+            })
+        
+        return formatted
+    
+    def format_ticker_data(self, raw_data: Dict, timestamp: Optional[str] = None) -> Dict:
         """
         Форматировать данные тикера для frontend (оптимизированная версия)
         """
+        if timestamp is None:
+            timestamp = datetime.utcnow().isoformat()
+        
         try:
             if "error" in raw_data:
                 return {
@@ -137,18 +333,11 @@ class OptimizedMEXCService:
                     "volume": 0.0,
                     "high24h": 0.0,
                     "low24h": 0.0,
-                    "timestamp": datetime.utcnow().isoformat(),
+                    "timestamp": timestamp,
                     "source": "mexc",
                     "error": raw_data.get("error", "unknown")
                 }
             
-            # Быстрое преобразование с обработкой ошибок
-            def safe_float(value, default=0.0):
-                try:
-                    return float(value) if value and value != "0" else default
-                except (ValueError, TypeError):
-                    return default
-            
             return {
                 "symbol": raw_data.get("symbol", ""),
                 "price": safe_float(raw_data.get("lastPrice")),
@@ -157,7 +346,7 @@ class OptimizedMEXCService:
                 "volume": safe_float(raw_data.get("volume")),
                 "high24h": safe_float(raw_data.get("highPrice")),
                 "low24h": safe_float(raw_data.get("lowPrice")),
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": timestamp,
                 "source": "mexc"
             }
             
@@ -171,7 +360,7 @@ class OptimizedMEXCService:
                 "volume": 0.0,
                 "high24h": 0.0,
                 "low24h": 0.0,
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": timestamp,
                 "source": "mexc",
                 "error": "formatting_error"
             }
@@ -189,7 +378,7 @@ class OptimizedMEXCService:
             Список K-line данных
         """
         try:
-            session = await self.get_session()
+            session = await get_shared_session()
             url = f"{self.base_url}/api/v3/klines"
             
             params = {
@@ -198,12 +387,12 @@ class OptimizedMEXCService:
                 'limit': min(limit, 1000)  # MEXC лимит
             }
             
-            logger.debug(f"Fetching klines for {symbol} {interval} (limit: {limit})")
+            logger.debug("Fetching klines for %s %s (limit: %s)", symbol, interval, limit)
             
             async with session.get(url, params=params) as response:
                 if response.status == 200:
-                    klines = await response.json()
-                    logger.debug(f"Successfully fetched {len(klines)} klines for {symbol} {interval}")
+                    klines = orjson.loads(await response.read())
+                    logger.debug("Successfully fetched %d klines for %s %s", len(klines), symbol, interval)
                     return klines
                 else:
                     error_text = await response.text()
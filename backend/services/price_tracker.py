@@ -1,20 +1,16 @@
-import asyncio
 import logging
 from typing import Dict, List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 from dataclasses import dataclass, field
+from collections import deque
+from itertools import islice
 import time
+import numpy as np
+from .price_tracker_advanced import utc_isoformat
 
 logger = logging.getLogger(__name__)
 
-@dataclass
-class PricePoint:
-    """Точка данных цены"""
-    price: float
-    timestamp: datetime
-    volume: float = 0
-
-@dataclass
+@dataclass(slots=True)
 class Candle:
     """Свечные данные OHLC"""
     open: float
@@ -34,17 +30,81 @@ class Candle:
             "volume": self.volume,
             "start_time": self.start_time.isoformat(),
             "end_time": self.end_time.isoformat(),
-            "timestamp": int(self.start_time.timestamp() * 1000)
+            "timestamp": int(self.start_time.replace(tzinfo=timezone.utc).timestamp() * 1000)
         }
 
-@dataclass
+@dataclass(slots=True)
 class SymbolData:
     """Данные по символу"""
     symbol: str
-    price_history: List[PricePoint] = field(default_factory=list)
-    candles: List[Candle] = field(default_factory=list)
+    capacity: int = 100  # Размер кольцевого буфера истории цен
+    candles: deque = field(default_factory=lambda: deque(maxlen=50))  # Завершенные свечи, старые вытесняются
+    # to_dict() завершенных свечей (параллельно candles): закрытая свеча больше не меняется
+    candle_dicts: deque = field(default_factory=lambda: deque(maxlen=50))
     current_candle: Optional[Candle] = None
-    current_candle_start: Optional[datetime] = None
+    current_candle_start: Optional[int] = None  # Начало текущей свечи (unix, секунды)
+    prices: np.ndarray = field(init=False)
+    ts_epoch: np.ndarray = field(init=False)
+    volumes: np.ndarray = field(init=False)
+    head: int = field(init=False)
+    count: int = field(init=False)
+    
+    def __post_init__(self):
+        # История цен: кольцевой буфер в виде столбцов (цена, unix-время, объем)
+        self.prices = np.zeros(self.capacity)
+        self.ts_epoch = np.zeros(self.capacity)
+        self.volumes = np.zeros(self.capacity)
+        self.head = 0  # Позиция следующей записи
+        self.count = 0  # Количество заполненных точек
+    
+    def append_point(self, price: float, ts_epoch: float, volume: float):
+        """Записать точку поверх самой старой, без копирования истории"""
+        head = self.head
+        self.prices[head] = price
+        self.ts_epoch[head] = ts_epoch
+        self.volumes[head] = volume
+        self.head = (head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+    
+    def nearest_indices(self, targets: List[float]) -> List[int]:
+        """
+        Физические индексы точек, ближайших по времени к каждому из targets
+        (при равенстве - более ранней). Один бинарный поиск сразу по всем targets.
+        """
+        capacity = self.capacity
+        count = self.count
+        start = (self.head - count) % capacity
+        end = start + count
+        if end <= capacity:
+            ts = self.ts_epoch[start:end]
+        else:
+            ts = np.concatenate((self.ts_epoch[start:], self.ts_epoch[:end - capacity]))
+        
+        indices = []
+        for target, i in zip(targets, ts.searchsorted(targets).tolist()):
+            if i == count or (i > 0 and target - ts[i - 1] <= ts[i] - target):
+                i -= 1
+            indices.append((start + i) % capacity)
+        return indices
+    
+    def last_index(self) -> int:
+        return (self.head - 1) % self.capacity
+    
+    def oldest_count_until(self, cutoff: float) -> int:
+        """Количество самых старых точек со временем не позже cutoff"""
+        capacity = self.capacity
+        ts = self.ts_epoch
+        start = (self.head - self.count) % capacity
+        first = ts[start:min(start + self.count, capacity)]
+        wrapped = self.count - len(first)
+        if wrapped and cutoff >= first[-1]:
+            return len(first) + int(ts[:wrapped].searchsorted(cutoff, side='right'))
+        return int(first.searchsorted(cutoff, side='right'))
+    
+    def drop_oldest(self, n: int):
+        """Удалить n самых старых точек"""
+        self.count -= min(n, self.count)
     
 class PriceTracker:
     """Трекер цен для отслеживания коротких интервалов и формирования свечей"""
@@ -57,33 +117,30 @@ class PriceTracker:
         
     def add_price_point(self, symbol: str, price: float, volume: float = 0):
         """Добавить новую точку цены"""
-        now = datetime.utcnow()
+        now_epoch = time.time()
         
         if symbol not in self.symbols_data:
-            self.symbols_data[symbol] = SymbolData(symbol=symbol)
+            self.symbols_data[symbol] = SymbolData(
+                symbol=symbol,
+                capacity=self.max_history_points,
+                candles=deque(maxlen=self.max_candles),
+                candle_dicts=deque(maxlen=self.max_candles)
+            )
         
         symbol_data = self.symbols_data[symbol]
         
-        # Добавляем точку в историю
-        price_point = PricePoint(price=price, timestamp=now, volume=volume)
-        symbol_data.price_history.append(price_point)
-        
-        # Ограничиваем размер истории
-        if len(symbol_data.price_history) > self.max_history_points:
-            symbol_data.price_history = symbol_data.price_history[-self.max_history_points:]
+        # Добавляем точку в историю (размер ограничен кольцевым буфером)
+        symbol_data.append_point(price, now_epoch, volume)
         
         # Обновляем/создаем свечу
-        self._update_candle(symbol_data, price_point)
+        self._update_candle(symbol_data, price, volume, now_epoch)
         
-        logger.debug(f"Added price point for {symbol}: ${price} at {now}")
+        logger.debug("Added price point for %s: $%s at %s", symbol, price, now_epoch)
     
-    def _update_candle(self, symbol_data: SymbolData, price_point: PricePoint):
+    def _update_candle(self, symbol_data: SymbolData, price: float, volume: float, ts_epoch: float):
         """Обновить текущую свечу или создать новую"""
-        now = price_point.timestamp
-        
-        # Определяем начало текущего интервала свечи
-        candle_start = self._get_candle_start_time(now)
-        candle_end = candle_start + timedelta(seconds=self.candle_duration)
+        # Определяем начало текущего интервала свечи (целочисленно, без datetime)
+        candle_start = self._get_candle_start_time(ts_epoch)
         
         # Если это новый интервал или первая свеча
         if (symbol_data.current_candle is None or 
@@ -92,75 +149,66 @@ class PriceTracker:
             # Завершаем предыдущую свечу
             if symbol_data.current_candle is not None:
                 symbol_data.candles.append(symbol_data.current_candle)
-                
-                # Ограничиваем количество свечей
-                if len(symbol_data.candles) > self.max_candles:
-                    symbol_data.candles = symbol_data.candles[-self.max_candles:]
+                symbol_data.candle_dicts.append(symbol_data.current_candle.to_dict())
             
-            # Создаем новую свечу
+            # Создаем новую свечу: datetime строится один раз на интервал
             symbol_data.current_candle = Candle(
-                open=price_point.price,
-                high=price_point.price,
-                low=price_point.price,
-                close=price_point.price,
-                volume=price_point.volume,
-                start_time=candle_start,
-                end_time=candle_end
+                open=price,
+                high=price,
+                low=price,
+                close=price,
+                volume=volume,
+                start_time=datetime.utcfromtimestamp(candle_start),
+                end_time=datetime.utcfromtimestamp(candle_start + self.candle_duration)
             )
             symbol_data.current_candle_start = candle_start
             
         else:
             # Обновляем текущую свечу
+            # (сравнения дешевле вызовов max/min; low <= high, поэтому цена
+            # обновляет не больше одной границы)
             candle = symbol_data.current_candle
-            candle.high = max(candle.high, price_point.price)
-            candle.low = min(candle.low, price_point.price)
-            candle.close = price_point.price
-            candle.volume += price_point.volume
-            candle.end_time = candle_end
-    
-    def _get_candle_start_time(self, timestamp: datetime) -> datetime:
-        """Получить время начала свечи для данного timestamp"""
+            if price > candle.high:
+                candle.high = price
+            elif price < candle.low:
+                candle.low = price
+            candle.close = price
+            candle.volume += volume
+    
+    def _get_candle_start_time(self, ts_epoch: float) -> int:
+        """Получить время начала свечи (unix, секунды) для данного timestamp"""
         # Округляем до ближайшего интервала
-        seconds_since_epoch = int(timestamp.timestamp())
-        interval_start = (seconds_since_epoch // self.candle_duration) * self.candle_duration
-        return datetime.utcfromtimestamp(interval_start)
+        return (int(ts_epoch) // self.candle_duration) * self.candle_duration
     
     def get_price_change(self, symbol: str, seconds_ago: int) -> Optional[Dict]:
         """Получить изменение цены за указанное количество секунд"""
-        if symbol not in self.symbols_data:
-            return None
-        
-        symbol_data = self.symbols_data[symbol]
-        if not symbol_data.price_history:
-            return None
-        
-        now = datetime.utcnow()
-        target_time = now - timedelta(seconds=seconds_ago)
-        
-        # Находим ближайшую точку по времени
-        target_price = None
-        min_time_diff = float('inf')
-        
-        for point in symbol_data.price_history:
-            time_diff = abs((point.timestamp - target_time).total_seconds())
-            if time_diff < min_time_diff:
-                min_time_diff = time_diff
-                target_price = point.price
+        return self.get_price_changes(symbol, [seconds_ago]).get(seconds_ago)
+    
+    def get_price_changes(self, symbol: str, seconds_list: List[int]) -> Dict[int, Optional[Dict]]:
+        """Получить изменения цены сразу для нескольких интервалов: {seconds_ago: change}"""
+        symbol_data = self.symbols_data.get(symbol)
+        if symbol_data is None or not symbol_data.count:
+            return {seconds_ago: None for seconds_ago in seconds_list}
         
-        if target_price is None:
-            return None
+        now = time.time()
         
-        current_price = symbol_data.price_history[-1].price
-        price_change = current_price - target_price
-        percent_change = (price_change / target_price) * 100 if target_price > 0 else 0
+        # Находим ближайшие точки по времени одним бинарным поиском по истории
+        targets = [now - seconds_ago for seconds_ago in seconds_list]
+        target_prices = symbol_data.prices[symbol_data.nearest_indices(targets)].tolist()
+        current_price = float(symbol_data.prices[symbol_data.last_index()])
         
-        return {
-            "price_change": price_change,
-            "percent_change": percent_change,
-            "seconds_ago": seconds_ago,
-            "old_price": target_price,
-            "current_price": current_price
-        }
+        changes = {}
+        for seconds_ago, target_price in zip(seconds_list, target_prices):
+            price_change = current_price - target_price
+            percent_change = (price_change / target_price) * 100 if target_price > 0 else 0
+            changes[seconds_ago] = {
+                "price_change": price_change,
+                "percent_change": percent_change,
+                "seconds_ago": seconds_ago,
+                "old_price": target_price,
+                "current_price": current_price
+            }
+        return changes
     
     def get_candles(self, symbol: str, limit: int = 20) -> List[Dict]:
         """Получить свечные данные для символа"""
@@ -168,49 +216,55 @@ class PriceTracker:
             return []
         
         symbol_data = self.symbols_data[symbol]
-        candles = symbol_data.candles.copy()
+        candle_dicts = symbol_data.candle_dicts
+        current_candle = symbol_data.current_candle
+        total = len(candle_dicts) + (current_candle is not None)
+        
+        # Последние N свечей (семантика среза [-limit:]): из deque берется только
+        # нужный хвост, без копии всей очереди
+        start = slice(-limit, None).indices(total)[0]
+        candles = list(islice(candle_dicts, start, None))
         
-        # Добавляем текущую свечу, если она существует
-        if symbol_data.current_candle:
-            candles.append(symbol_data.current_candle)
+        # Добавляем текущую свечу, если она существует и попала в срез
+        if current_candle is not None and start < total:
+            candles.append(current_candle.to_dict())
         
-        # Возвращаем последние N свечей
-        return [candle.to_dict() for candle in candles[-limit:]]
+        return candles
     
     def get_all_symbols_data(self) -> Dict[str, Dict]:
         """Получить данные по всем символам"""
         result = {}
         
         for symbol, symbol_data in self.symbols_data.items():
-            if not symbol_data.price_history:
+            if not symbol_data.count:
                 continue
-                
+            
+            last = symbol_data.last_index()
+            changes = self.get_price_changes(symbol, [15, 30])
             result[symbol] = {
-                "current_price": symbol_data.price_history[-1].price,
-                "change_15s": self.get_price_change(symbol, 15),
-                "change_30s": self.get_price_change(symbol, 30),
+                "current_price": float(symbol_data.prices[last]),
+                "change_15s": changes[15],
+                "change_30s": changes[30],
                 "candles": self.get_candles(symbol, 20),
-                "last_updated": symbol_data.price_history[-1].timestamp.isoformat()
+                "last_updated": utc_isoformat(float(symbol_data.ts_epoch[last]))
             }
         
         return result
     
     def cleanup_old_data(self):
         """Очистить старые данные"""
-        cutoff_time = datetime.utcnow() - timedelta(minutes=30)
+        # Одна граница для истории и свечей: время свечей - наивное UTC из той же эпохи
+        cutoff_epoch = time.time() - 30 * 60
+        cutoff_time = datetime.utcfromtimestamp(cutoff_epoch)
         
         for symbol_data in self.symbols_data.values():
-            # Очищаем старые точки истории
-            symbol_data.price_history = [
-                point for point in symbol_data.price_history 
-                if point.timestamp > cutoff_time
-            ]
+            # Очищаем старые точки истории (история упорядочена по времени)
+            symbol_data.drop_oldest(symbol_data.oldest_count_until(cutoff_epoch))
             
-            # Очищаем старые свечи
-            symbol_data.candles = [
-                candle for candle in symbol_data.candles 
-                if candle.start_time > cutoff_time
-            ]
+            # Очищаем старые свечи (свечи упорядочены по времени)
+            while symbol_data.candles and symbol_data.candles[0].start_time <= cutoff_time:
+                symbol_data.candles.popleft()
+                symbol_data.candle_dicts.popleft()
 
 # Глобальный экземпляр трекера
 price_tracker = PriceTracker(candle_duration_seconds=30)
\ No newline at end of file
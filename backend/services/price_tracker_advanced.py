@@ -1,22 +1,201 @@
-import asyncio
 import logging
-from typing import Dict, List, Optional, Set
-from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
 from dataclasses import dataclass, field
-from collections import deque
+from functools import lru_cache
+import heapq
+from bisect import bisect_left, bisect_right
 import threading
-import math
+import time
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
-@dataclass
-class PricePoint:
-    """Компактная точка данных цены"""
-    price: float
-    timestamp: float  # Unix timestamp для экономии памяти
-    volume: float = 0
+@lru_cache(maxsize=1024)
+def utc_isoformat(timestamp: float) -> str:
+    """
+    ISO-строка UTC для Unix timestamp (datetime.utcfromtimestamp(timestamp).isoformat()).
+    
+    Границы свечей и время тика одинаковы у всех символов, поэтому почти каждый
+    вызов - попадание в кэш без создания datetime.
+    """
+    return datetime.utcfromtimestamp(timestamp).isoformat()
+
+def _prefer_before(position, count, before_time, after_time, target_time):
+    """
+    Правило выбора ближайшей точки, общее для PriceHistoryBuffer и PriceHistoryMatrix.
+    
+    position - позиция target_time среди count точек (как у np.searchsorted), before_time/after_time -
+    время точек position - 1 и min(position, count - 1). True - ближе предыдущая точка
+    (при равном расстоянии берется более свежая, то есть последующая).
+    """
+    return (position > 0) & (position < count) & (target_time - before_time < after_time - target_time)
 
-@dataclass
+class PriceHistoryBuffer:
+    """История цен в формате Struct-of-Arrays (три непрерывных массива NumPy: время, цена, объем)"""
+    
+    __slots__ = ('capacity', 'timestamps', 'prices', 'volumes', 'start', 'end')
+    
+    def __init__(self, capacity: int = 500):
+        self.capacity = capacity
+        # Массивы с двойным запасом: окно [start, end) всегда непрерывно и отсортировано
+        # по времени, поэтому поиск идет через np.searchsorted без склейки кольца.
+        # Когда место заканчивается, последние точки копируются в начало (амортизированно O(1)).
+        self.timestamps = np.empty(capacity * 2, dtype=np.float64)
+        self.prices = np.empty(capacity * 2, dtype=np.float64)
+        self.volumes = np.empty(capacity * 2, dtype=np.float64)
+        self.start = 0
+        self.end = 0
+    
+    def __len__(self) -> int:
+        return self.end - self.start
+    
+    def append(self, timestamp: float, price: float, volume: float = 0):
+        """Добавить точку, вытесняя самую старую при превышении capacity"""
+        if self.end == len(self.timestamps):
+            keep = self.capacity - 1
+            src = self.end - keep
+            self.timestamps[:keep] = self.timestamps[src:self.end]
+            self.prices[:keep] = self.prices[src:self.end]
+            self.volumes[:keep] = self.volumes[src:self.end]
+            self.start, self.end = 0, keep
+        
+        self.timestamps[self.end] = timestamp
+        self.prices[self.end] = price
+        self.volumes[self.end] = volume
+        self.end += 1
+        
+        if self.end - self.start > self.capacity:
+            self.start += 1
+    
+    def nearest_prices(self, target_times: List[float]) -> List[Optional[float]]:
+        """
+        Цены точек, ближайших по времени к каждому из target_times (при равенстве - более свежей),
+        одним бинарным поиском
+        """
+        if self.end == self.start:
+            return [None] * len(target_times)
+        
+        timestamps = self.timestamps[self.start:self.end]
+        count = len(timestamps)
+        target_times = np.asarray(target_times, dtype=np.float64)
+        
+        position = np.searchsorted(timestamps, target_times)
+        after = np.minimum(position, count - 1)
+        before = np.maximum(position - 1, 0)
+        use_before = _prefer_before(position, count, timestamps[before], timestamps[after], target_times)
+        return self.prices[self.start:self.end][np.where(use_before, before, after)].tolist()
+
+class PriceHistoryMatrix:
+    """
+    История цен всех символов трекера в формате Struct-of-Arrays: матрицы
+    (строка символа x точка) времени, цены и объема. Строка - кольцевой буфер
+    на capacity точек, поэтому ближайшие по времени цены для многих символов
+    находятся одной векторной операцией.
+    """
+    
+    def __init__(self, capacity: int = 500, rows: int = 256):
+        self.capacity = capacity
+        # Пустые ячейки имеют время -inf и никогда не оказываются ближайшими
+        self.timestamps = np.full((rows, capacity), -np.inf)
+        self.prices = np.zeros((rows, capacity))
+        self.volumes = np.zeros((rows, capacity))
+        self.head = np.zeros(rows, dtype=np.intp)   # Позиция следующей записи
+        self.count = np.zeros(rows, dtype=np.intp)  # Количество точек в строке
+        self.free_rows: List[int] = list(range(rows - 1, -1, -1))
+    
+    def allocate_row(self) -> int:
+        """Выделить пустую строку под новый символ"""
+        if not self.free_rows:
+            self._grow()
+        return self.free_rows.pop()
+    
+    def release_row(self, row: int):
+        """Очистить строку удаленного символа и вернуть ее в пул"""
+        self.timestamps[row] = -np.inf
+        self.head[row] = 0
+        self.count[row] = 0
+        self.free_rows.append(row)
+    
+    def _grow(self):
+        """Удвоить количество строк"""
+        rows = len(self.head)
+        self.timestamps = np.vstack([self.timestamps, np.full((rows, self.capacity), -np.inf)])
+        self.prices = np.vstack([self.prices, np.zeros((rows, self.capacity))])
+        self.volumes = np.vstack([self.volumes, np.zeros((rows, self.capacity))])
+        self.head = np.concatenate([self.head, np.zeros(rows, dtype=np.intp)])
+        self.count = np.concatenate([self.count, np.zeros(rows, dtype=np.intp)])
+        self.free_rows.extend(range(2 * rows - 1, rows - 1, -1))
+    
+    def append(self, row: int, timestamp: float, price: float, volume: float = 0):
+        """Добавить точку в строку, вытесняя самую старую"""
+        head = self.head[row]
+        self.timestamps[row, head] = timestamp
+        self.prices[row, head] = price
+        self.volumes[row, head] = volume
+        self.head[row] = (head + 1) % self.capacity
+        if self.count[row] < self.capacity:
+            self.count[row] += 1
+    
+    def append_many(self, rows: np.ndarray, timestamp: float, prices: np.ndarray, volumes: np.ndarray):
+        """Добавить по одной точке с общим временем в каждую из строк rows (строки не повторяются)"""
+        heads = self.head[rows]
+        self.timestamps[rows, heads] = timestamp
+        self.prices[rows, heads] = prices
+        self.volumes[rows, heads] = volumes
+        self.head[rows] = (heads + 1) % self.capacity
+        self.count[rows] = np.minimum(self.count[rows] + 1, self.capacity)
+    
+    def nearest_prices(self, rows: np.ndarray, target_time: float) -> np.ndarray:
+        """
+        Цены точек, ближайших по времени к target_time, для каждой из строк rows
+        (при равном расстоянии - более свежей). Для пустых строк - NaN.
+        """
+        count = self.count[rows]
+        oldest = self.head[rows] - count  # Позиция самой старой точки (по модулю capacity)
+        
+        # Точки строки упорядочены по времени по кругу от oldest: позиция target_time
+        # (число точек раньше него, как у np.searchsorted) ищется бинарным поиском
+        # сразу по всем строкам - log2(capacity) шагов, на каждом читается по одной ячейке строки
+        position = np.zeros(len(rows), dtype=np.intp)
+        high = count.copy()
+        for _ in range(self.capacity.bit_length()):
+            active = position < high
+            if not active.any():
+                break
+            middle = (position + high) // 2
+            earlier = self.timestamps[rows, (oldest + middle) % self.capacity] < target_time
+            position = np.where(active & earlier, middle + 1, position)
+            high = np.where(active & ~earlier, middle, high)
+        
+        # Из соседей по позиции берем ближайшего (при равенстве - более свежего)
+        after = np.minimum(position, count - 1)
+        before = np.maximum(position - 1, 0)
+        after_index = (oldest + after) % self.capacity
+        before_index = (oldest + before) % self.capacity
+        after_time = self.timestamps[rows, after_index]
+        before_time = self.timestamps[rows, before_index]
+        use_before = _prefer_before(position, count, before_time, after_time, target_time)
+        
+        prices = self.prices[rows, np.where(use_before, before_index, after_index)]
+        prices[count == 0] = np.nan
+        return prices
+
+# Таймфреймы свечей: (имя, длительность в секундах, сколько завершенных свечей хранить)
+TIMEFRAMES: Tuple[Tuple[str, int, int], ...] = (
+    ('15s', 15, 100),
+    ('30s', 30, 100),
+    ('1m', 60, 100),
+    ('5m', 300, 50),
+    ('15m', 900, 50),
+    ('1h', 3600, 30),
+    ('4h', 14400, 30),
+    ('1d', 86400, 30),
+)
+# Имя таймфрейма -> индекс в списках свечей AdvancedSymbolData
+TIMEFRAME_INDEX: Dict[str, int] = {name: i for i, (name, _, _) in enumerate(TIMEFRAMES)}
+
+@dataclass(slots=True)
 class AdvancedCandle:
     """Продвинутые свечные данные с поддержкой разных таймфреймов"""
     open: float
@@ -35,47 +214,202 @@ class AdvancedCandle:
             "low": self.low,
             "close": self.close,
             "volume": self.volume,
-            "start_time": datetime.fromtimestamp(self.start_time).isoformat(),
-            "end_time": datetime.fromtimestamp(self.end_time).isoformat(),
+            "start_time": utc_isoformat(self.start_time),
+            "end_time": utc_isoformat(self.end_time),
             "timestamp": int(self.start_time * 1000),
             "timeframe": self.timeframe
         }
 
-@dataclass
+class CandleRing:
+    """
+    Завершенные свечи одного таймфрейма: кольцевой буфер NumPy (capacity x 7)
+    со столбцами open, high, low, close, volume, start_time, end_time
+    """
+    
+    __slots__ = ('capacity', 'data', 'head', 'count')
+    
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.data = np.empty((capacity, 7), dtype=np.float64)
+        self.head = 0   # Позиция следующей записи
+        self.count = 0
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def append(self, candle: AdvancedCandle):
+        """Добавить завершенную свечу, вытесняя самую старую"""
+        self.append_row((candle.open, candle.high, candle.low, candle.close,
+                         candle.volume, candle.start_time, candle.end_time))
+    
+    def append_row(self, row):
+        """Добавить завершенную свечу, заданную строкой (open, high, low, close, volume, start_time, end_time)"""
+        self.data[self.head] = row
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+    
+    def extend(self, rows: np.ndarray):
+        """Добавить завершенные свечи (строки по порядку времени) не более чем двумя копированиями блоков"""
+        count = len(rows)
+        if count >= self.capacity:
+            # Остаются только последние capacity свечей
+            np.copyto(self.data, rows[count - self.capacity:])
+            self.head = 0
+            self.count = self.capacity
+            return
+        
+        first = min(count, self.capacity - self.head)
+        self.data[self.head:self.head + first] = rows[:first]
+        self.data[:count - first] = rows[first:]
+        self.head = (self.head + count) % self.capacity
+        self.count = min(self.count + count, self.capacity)
+    
+    def tail(self, start: int = 0) -> np.ndarray:
+        """Копия свечей с позиции start (0 - самая старая) до конца, по порядку времени"""
+        if start >= self.count:
+            return self.data[:0].copy()
+        return self.data.take(np.arange(self.head - self.count + start, self.head), axis=0, mode='wrap')
+
+def _iso_strings(times: np.ndarray) -> List[str]:
+    """ISO-строки UTC для столбца Unix timestamp (как datetime.utcfromtimestamp(t).isoformat())"""
+    if np.array_equal(times, np.floor(times)):
+        # Целые секунды (обычный случай - границы свечей) форматируются одной операцией
+        return np.datetime_as_string(times.astype(np.int64).astype('datetime64[s]')).tolist()
+    return [utc_isoformat(t) for t in times.tolist()]
+
+def candle_rows_to_dicts(rows: np.ndarray, timeframe: str) -> List[Dict]:
+    """Словари свечей (как AdvancedCandle.to_dict) для строк CandleRing"""
+    if not len(rows):
+        return []
+    
+    start_times = _iso_strings(rows[:, 5])
+    end_times = _iso_strings(rows[:, 6])
+    timestamps = (rows[:, 5] * 1000).astype(np.int64).tolist()
+    
+    return [
+        {
+            "open": open_,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": volume,
+            "start_time": start_time,
+            "end_time": end_time,
+            "timestamp": timestamp,
+            "timeframe": timeframe
+        }
+        for (open_, high, low, close, volume, _, _), start_time, end_time, timestamp
+        in zip(rows.tolist(), start_times, end_times, timestamps)
+    ]
+
+class CurrentCandleMatrix:
+    """
+    Текущие (незавершенные) свечи всех символов трекера в формате Struct-of-Arrays:
+    матрица (строка символа x таймфрейм x open/high/low/close/volume) и матрицы
+    начала и конца свечей. Строки совпадают со строками PriceHistoryMatrix, поэтому
+    тик обновляет свечи всех символов и таймфреймов несколькими векторными операциями.
+    """
+    
+    def __init__(self, timeframes: int, rows: int = 256):
+        self.ohlcv = np.zeros((rows, timeframes, 5))
+        # NaN - свечи таймфрейма еще нет
+        self.start = np.full((rows, timeframes), np.nan)
+        self.end = np.zeros((rows, timeframes))
+    
+    def ensure_rows(self, rows: int):
+        """Расширить матрицы (удвоением), чтобы в них было не меньше rows строк"""
+        while len(self.start) < rows:
+            count = len(self.start)
+            self.ohlcv = np.concatenate([self.ohlcv, np.zeros_like(self.ohlcv)])
+            self.start = np.concatenate([self.start, np.full((count, self.start.shape[1]), np.nan)])
+            self.end = np.concatenate([self.end, np.zeros_like(self.end)])
+    
+    def release_row(self, row: int):
+        """Сбросить свечи удаленного символа"""
+        self.start[row] = np.nan
+    
+    def update(self, rows: np.ndarray, prices: np.ndarray, volumes: np.ndarray,
+               starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Учесть по одной цене в каждой из строк rows (строки не повторяются) для всех таймфреймов.
+        
+        starts/ends - границы текущих свечей каждого таймфрейма на время тика.
+        
+        Returns:
+            Кортеж (индексы (позиция в rows, таймфрейм) завершенных свечей, их строки
+            open, high, low, close, volume, start_time, end_time)
+        """
+        ohlcv = self.ohlcv[rows]
+        start = self.start[rows]
+        end = self.end[rows]
+        price = prices[:, None]
+        volume = volumes[:, None]
+        
+        # Новый интервал (или первая свеча) - свеча открывается заново, прежняя завершается
+        roll = start != starts
+        if not roll.any():
+            # Частый случай: ни одна граница не пересечена - только слияние цены
+            # в текущие свечи, границы не меняются
+            np.maximum(ohlcv[:, :, 1], price, out=ohlcv[:, :, 1])
+            np.minimum(ohlcv[:, :, 2], price, out=ohlcv[:, :, 2])
+            ohlcv[:, :, 3] = price
+            ohlcv[:, :, 4] += volume
+            self.ohlcv[rows] = ohlcv
+            return np.empty((0, 2), dtype=np.intp), np.empty((0, 7))
+        
+        closed = np.argwhere(roll & ~np.isnan(start))
+        if len(closed):
+            row, tf = closed[:, 0], closed[:, 1]
+            closed_rows = np.column_stack([ohlcv[row, tf], start[row, tf], end[row, tf]])
+        else:
+            closed_rows = np.empty((0, 7))
+        
+        ohlcv[:, :, 0] = np.where(roll, price, ohlcv[:, :, 0])
+        ohlcv[:, :, 1] = np.where(roll, price, np.maximum(ohlcv[:, :, 1], price))
+        ohlcv[:, :, 2] = np.where(roll, price, np.minimum(ohlcv[:, :, 2], price))
+        ohlcv[:, :, 3] = price
+        ohlcv[:, :, 4] = np.where(roll, volume, ohlcv[:, :, 4] + volume)
+        
+        self.ohlcv[rows] = ohlcv
+        self.start[rows] = starts
+        self.end[rows] = ends
+        return closed, closed_rows
+    
+    def candle(self, row: int, tf_index: int, timeframe: str) -> Optional[AdvancedCandle]:
+        """Текущая свеча строки и таймфрейма (None, если ее нет)"""
+        start_time = self.start[row, tf_index]
+        if np.isnan(start_time):
+            return None
+        open_, high, low, close, volume = self.ohlcv[row, tf_index].tolist()
+        return AdvancedCandle(
+            open=open_,
+            high=high,
+            low=low,
+            close=close,
+            volume=volume,
+            start_time=float(start_time),
+            end_time=float(self.end[row, tf_index]),
+            timeframe=timeframe
+        )
+
+@dataclass(slots=True)
 class AdvancedSymbolData:
     """Продвинутые данные по символу с поддержкой множественных таймфреймов"""
     symbol: str
-    price_history: deque = field(default_factory=lambda: deque(maxlen=500))  # Больше истории для разных таймфреймов
-    
-    # Свечи для разных таймфреймов
-    candles_15s: deque = field(default_factory=lambda: deque(maxlen=100))
-    candles_30s: deque = field(default_factory=lambda: deque(maxlen=100))  
-    candles_1m: deque = field(default_factory=lambda: deque(maxlen=100))
-    candles_5m: deque = field(default_factory=lambda: deque(maxlen=50))
-    candles_15m: deque = field(default_factory=lambda: deque(maxlen=50))
-    candles_1h: deque = field(default_factory=lambda: deque(maxlen=30))
-    candles_4h: deque = field(default_factory=lambda: deque(maxlen=30))
-    candles_1d: deque = field(default_factory=lambda: deque(maxlen=30))
-    
-    # Текущие свечи для каждого таймфрейма
-    current_candle_15s: Optional[AdvancedCandle] = None
-    current_candle_30s: Optional[AdvancedCandle] = None
-    current_candle_1m: Optional[AdvancedCandle] = None
-    current_candle_5m: Optional[AdvancedCandle] = None
-    current_candle_15m: Optional[AdvancedCandle] = None
-    current_candle_1h: Optional[AdvancedCandle] = None
-    current_candle_4h: Optional[AdvancedCandle] = None
-    current_candle_1d: Optional[AdvancedCandle] = None
-    
-    # Стартовое время для каждого таймфрейма
-    current_candle_start_15s: Optional[float] = None
-    current_candle_start_30s: Optional[float] = None
-    current_candle_start_1m: Optional[float] = None
-    current_candle_start_5m: Optional[float] = None
-    current_candle_start_15m: Optional[float] = None
-    current_candle_start_1h: Optional[float] = None
-    current_candle_start_4h: Optional[float] = None
-    current_candle_start_1d: Optional[float] = None
+    # Собственная история символа; AdvancedPriceTracker хранит историю в общей
+    # PriceHistoryMatrix и использует history_row
+    price_history: Optional[PriceHistoryBuffer] = None
+    history_row: int = -1
+    
+    # Свечи по таймфреймам: индекс - позиция таймфрейма в TIMEFRAMES
+    candles: List[CandleRing] = field(default_factory=lambda: [CandleRing(maxlen) for _, _, maxlen in TIMEFRAMES])
+    # Текущие (незавершенные) свечи и время их начала для каждого таймфрейма
+    # (у PriceTrackerWithHistory; AdvancedPriceTracker хранит их в CurrentCandleMatrix)
+    current: List[Optional[AdvancedCandle]] = field(default_factory=lambda: [None] * len(TIMEFRAMES))
+    start: List[Optional[float]] = field(default_factory=lambda: [None] * len(TIMEFRAMES))
+    # Целая секунда, на которую текущие свечи уже приведены к своим интервалам
+    candle_second: int = -1
     
     last_price: float = 0.0
     last_update: float = 0.0
@@ -83,151 +417,232 @@ class AdvancedSymbolData:
 class AdvancedPriceTracker:
     """Продвинутый трекер цен с поддержкой множественных таймфреймов"""
     
-    def __init__(self):
+    # Колонки изменения цены, по которым можно сортировать: фиксированные интервалы
+    # (в секундах) и настраиваемые (индекс в interval_configs запроса)
+    FIXED_CHANGE_COLUMNS = {"change_15s": 15, "change_30s": 30}
+    INTERVAL_CHANGE_COLUMNS = {"change_interval_0": 0, "change_interval_1": 1, "change_interval_2": 2}
+    
+    def __init__(self, timeframes: Tuple[Tuple[str, int, int], ...] = TIMEFRAMES,
+                 history_capacity: int = 500, inactive_seconds: int = 3600):
+        """
+        Args:
+            timeframes: Таймфреймы свечей (имя, длительность в секундах, сколько завершенных свечей хранить)
+            history_capacity: Сколько точек истории цен хранить на символ
+            inactive_seconds: Через сколько секунд без обновлений символ удаляется при очистке
+        """
         self.symbols_data: Dict[str, AdvancedSymbolData] = {}
-        self.active_symbols: Set[str] = set()
         self.lock = threading.RLock()
+        # Очередь на проверку устаревания: (last_update на момент постановки, symbol).
+        # Запись не обновляется на каждом тике - при извлечении время сверяется с текущим
+        self._expiry_heap: List[Tuple[float, str]] = []
+        
+        # История цен всех символов (500 точек на символ - хватает для разных таймфреймов)
+        self.history = PriceHistoryMatrix(capacity=history_capacity)
+        # Текущие свечи всех символов; строки совпадают со строками истории
+        self.current_candles = CurrentCandleMatrix(len(timeframes), rows=len(self.history.head))
+        self.inactive_seconds = inactive_seconds
+        
+        # Последний снимок 24h данных тикеров от MEXC (TickerSnapshot).
+        # Заменяется целиком, поэтому читатели получают согласованный снимок без lock
+        self.ticker_snapshot = None
         
         # Таймфреймы в секундах
-        self.timeframes = {
-            '15s': 15,
-            '30s': 30,
-            '1m': 60,
-            '5m': 300,
-            '15m': 900,
-            '1h': 3600,
-            '4h': 14400,
-            '1d': 86400
-        }
+        self.timeframe_specs = timeframes
+        self.timeframes = {name: seconds for name, seconds, _ in timeframes}
+        self.timeframe_index = {name: i for i, (name, _, _) in enumerate(timeframes)}
+        # Длительности таймфреймов - для границ свечей всех таймфреймов одной операцией
+        self._tf_durations = np.array([seconds for _, seconds, _ in timeframes], dtype=np.int64)
+        # Границы зависят только от целой секунды: точки одной секунды берут их из кэша
+        self._candle_bounds = lru_cache(maxsize=4)(self._compute_candle_bounds)
     
     def add_price_point(self, symbol: str, price: float, volume: float = 0):
         """Добавить новую точку цены и обновить все таймфреймы"""
         if price <= 0:
             return
             
-        now = datetime.utcnow().timestamp()
+        now = time.time()
         
         with self.lock:
-            if symbol not in self.symbols_data:
-                self.symbols_data[symbol] = AdvancedSymbolData(symbol=symbol)
-                self.active_symbols.add(symbol)
-            
-            symbol_data = self.symbols_data[symbol]
-            
-            # Добавляем точку в историю
-            price_point = PricePoint(price=price, timestamp=now, volume=volume)
-            symbol_data.price_history.append(price_point)
-            symbol_data.last_price = price
-            symbol_data.last_update = now
-            
-            # Обновляем свечи для всех таймфреймов
-            self._update_all_candles(symbol_data, price_point)
-    
-    def _update_all_candles(self, symbol_data: AdvancedSymbolData, price_point: PricePoint):
-        """Обновить свечи для всех таймфреймов"""
-        for tf_name, tf_seconds in self.timeframes.items():
-            self._update_candle_for_timeframe(symbol_data, price_point, tf_name, tf_seconds)
-    
-    def _update_candle_for_timeframe(self, symbol_data: AdvancedSymbolData, price_point: PricePoint, 
-                                   timeframe: str, duration_seconds: int):
-        """Обновить свечу для конкретного таймфрейма"""
-        now = price_point.timestamp
-        
-        # Получаем атрибуты для данного таймфрейма
-        candles_attr = f'candles_{timeframe}'
-        current_candle_attr = f'current_candle_{timeframe}'
-        current_start_attr = f'current_candle_start_{timeframe}'
-        
-        candles_deque = getattr(symbol_data, candles_attr)
-        current_candle = getattr(symbol_data, current_candle_attr)
-        current_start = getattr(symbol_data, current_start_attr)
-        
-        # Определяем начало текущего интервала
-        candle_start = self._get_candle_start_time(now, duration_seconds)
-        candle_end = candle_start + duration_seconds
-        
-        # Если это новый интервал или первая свеча
-        if current_candle is None or current_start != candle_start:
-            # Завершаем предыдущую свечу
-            if current_candle is not None:
-                candles_deque.append(current_candle)
+            self._add_price_point_locked(symbol, price, volume, now)
+    
+    def add_price_points_batch(self, points: Iterable[Tuple[str, float, float]],
+                               timestamp: Optional[float] = None):
+        """
+        Добавить пачку точек цены за одно взятие lock
+        
+        Args:
+            points: Кортежи (symbol, price, volume); все точки получают одно время
+            timestamp: Время точек (UTC timestamp), по умолчанию - текущее
+        """
+        now = time.time() if timestamp is None else timestamp
+        
+        with self.lock:
+            tracked, prices, volumes = [], [], []
+            for symbol, price, volume in points:
+                if price > 0:
+                    symbol_data = self._symbol_data_locked(symbol, now)
+                    symbol_data.last_price = price
+                    symbol_data.last_update = now
+                    tracked.append(symbol_data)
+                    prices.append(price)
+                    volumes.append(volume)
             
-            # Создаем новую свечу
-            new_candle = AdvancedCandle(
-                open=price_point.price,
-                high=price_point.price,
-                low=price_point.price,
-                close=price_point.price,
-                volume=price_point.volume,
-                start_time=candle_start,
-                end_time=candle_end,
-                timeframe=timeframe
-            )
+            if not tracked:
+                return
             
-            setattr(symbol_data, current_candle_attr, new_candle)
-            setattr(symbol_data, current_start_attr, candle_start)
-        else:
-            # Обновляем текущую свечу
-            current_candle.high = max(current_candle.high, price_point.price)
-            current_candle.low = min(current_candle.low, price_point.price)
-            current_candle.close = price_point.price
-            current_candle.volume += price_point.volume
-            current_candle.end_time = candle_end
+            rows = self._history_rows(tracked)
+            if len(set(rows.tolist())) == len(rows):
+                # История и свечи всех символов пишутся векторными операциями
+                self._append_points_locked(tracked, rows, now, np.array(prices, dtype=np.float64),
+                                           np.array(volumes, dtype=np.float64))
+            else:
+                # Символ повторяется в пачке - точки пишутся по одной, по порядку
+                for symbol_data, price, volume in zip(tracked, prices, volumes):
+                    self._append_points_locked([symbol_data], self._history_rows([symbol_data]), now,
+                                               np.array([price], dtype=np.float64), np.array([volume], dtype=np.float64))
+    
+    def _add_price_point_locked(self, symbol: str, price: float, volume: float, now: float):
+        """Добавить точку цены и обновить все таймфреймы (вызывается внутри lock)"""
+        symbol_data = self._symbol_data_locked(symbol, now)
+        symbol_data.last_price = price
+        symbol_data.last_update = now
+        self._append_points_locked([symbol_data], self._history_rows([symbol_data]), now,
+                                   np.array([price], dtype=np.float64), np.array([volume], dtype=np.float64))
+    
+    def _symbol_data_locked(self, symbol: str, now: float) -> AdvancedSymbolData:
+        """Данные символа, созданные при первом обращении (вызывается внутри lock)"""
+        symbol_data = self.symbols_data.get(symbol)
+        if symbol_data is None:
+            symbol_data = self.symbols_data[symbol] = self._new_symbol_data(symbol)
+            heapq.heappush(self._expiry_heap, (now, symbol))
+        return symbol_data
+    
+    def _append_points_locked(self, tracked: List[AdvancedSymbolData], rows: np.ndarray, now: float,
+                              prices: np.ndarray, volumes: np.ndarray):
+        """
+        Записать по одной точке с общим временем в историю и свечи символов tracked
+        (строки rows не повторяются; вызывается внутри lock)
+        """
+        self.history.append_many(rows, now, prices, volumes)
+        
+        starts, ends = self._candle_bounds(int(now))
+        
+        # Завершенные свечи (не чаще раза в интервал таймфрейма) уходят в кольца символов
+        closed, closed_rows = self.current_candles.update(rows, prices, volumes, starts, ends)
+        for (position, tf_index), row in zip(closed.tolist(), closed_rows):
+            tracked[position].candles[tf_index].append_row(row)
+    
+    def _new_symbol_data(self, symbol: str) -> AdvancedSymbolData:
+        """Данные нового символа со слотами свечей под таймфреймы трекера"""
+        row = self.history.allocate_row()
+        self.current_candles.ensure_rows(row + 1)
+        return AdvancedSymbolData(
+            symbol=symbol,
+            history_row=row,
+            candles=[CandleRing(maxlen) for _, _, maxlen in self.timeframe_specs]
+        )
     
-    def _get_candle_start_time(self, timestamp: float, duration_seconds: int) -> float:
-        """Получить время начала свечи для данного timestamp и таймфрейма"""
-        return (int(timestamp) // duration_seconds) * duration_seconds
+    def _compute_candle_bounds(self, seconds: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Начала и концы текущих свечей всех таймфреймов для целой секунды seconds (только для чтения)"""
+        starts = (seconds - seconds % self._tf_durations).astype(np.float64)
+        ends = starts + self._tf_durations
+        starts.flags.writeable = False
+        ends.flags.writeable = False
+        return starts, ends
     
     def get_price_change(self, symbol: str, seconds_ago: int) -> Optional[Dict]:
         """Получить изменение цены за указанное количество секунд"""
+        return self.get_price_changes([symbol], seconds_ago)[0]
+    
+    def get_price_changes(self, symbols: List[str], seconds_ago: int,
+                          now: Optional[float] = None) -> List[Optional[Dict]]:
+        """Получить изменения цены за seconds_ago секунд для списка символов одной векторной операцией"""
+        if now is None:
+            now = time.time()
+        
         with self.lock:
-            if symbol not in self.symbols_data:
-                return None
-            
-            symbol_data = self.symbols_data[symbol]
-            if not symbol_data.price_history:
-                return None
-            
-            now = datetime.utcnow().timestamp()
-            target_time = now - seconds_ago
-            
-            # Находим ближайшую точку по времени
-            target_price = None
-            min_time_diff = float('inf')
-            
-            for point in reversed(symbol_data.price_history):
-                time_diff = abs(point.timestamp - target_time)
-                if time_diff < min_time_diff:
-                    min_time_diff = time_diff
-                    target_price = point.price
-                    
-                    if time_diff < 1.0:
-                        break
+            tracked = [self.symbols_data.get(symbol) for symbol in symbols]
+            present = [symbol_data for symbol_data in tracked if symbol_data is not None]
+            if not present:
+                return [None] * len(symbols)
             
-            if target_price is None or target_price <= 0:
-                return None
+            return self._price_changes_locked(tracked, self._history_rows(present), seconds_ago, now)
+    
+    @staticmethod
+    def _history_rows(present: List[AdvancedSymbolData]) -> np.ndarray:
+        """Строки истории символов - целочисленные индексы вместо поиска по имени"""
+        return np.fromiter((symbol_data.history_row for symbol_data in present), dtype=np.intp, count=len(present))
+    
+    def _price_changes_locked(self, tracked: List[Optional[AdvancedSymbolData]], rows: np.ndarray,
+                              seconds_ago: int, now: float) -> List[Optional[Dict]]:
+        """
+        Изменения цены для уже найденных символов (вызывается внутри lock).
+        
+        rows - строки истории отслеживаемых символов из tracked (None пропускаются) в том же порядке.
+        """
+        # Ближайшие по времени цены всех символов сразу
+        target_prices = iter(self.history.nearest_prices(rows, now - seconds_ago).tolist())
+        
+        result = []
+        for symbol_data in tracked:
+            if symbol_data is None:
+                result.append(None)
+                continue
             
+            target_price = next(target_prices)
             current_price = symbol_data.last_price
-            if current_price <= 0:
-                return None
-                
+            if not target_price > 0 or current_price <= 0:  # NaN - истории нет
+                result.append(None)
+                continue
+            
             price_change = current_price - target_price
             percent_change = (price_change / target_price) * 100
             
-            return {
+            result.append({
                 "price_change": price_change,
                 "percent_change": percent_change,
                 "seconds_ago": seconds_ago,
                 "old_price": target_price,
                 "current_price": current_price
-            }
+            })
+        return result
+    
+    def get_percent_changes(self, symbols: List[str], seconds_ago: int) -> np.ndarray:
+        """Процентные изменения цены для списка символов (0 там, где изменения нет) - ключ сортировки"""
+        now = time.time()
+        
+        with self.lock:
+            tracked = [self.symbols_data.get(symbol) for symbol in symbols]
+            rows = np.fromiter((symbol_data.history_row if symbol_data else -1 for symbol_data in tracked),
+                               dtype=np.intp, count=len(tracked))
+            current = np.fromiter((symbol_data.last_price if symbol_data else 0.0 for symbol_data in tracked),
+                                  dtype=np.float64, count=len(tracked))
+            
+            known = rows >= 0
+            target = np.full(len(tracked), np.nan)
+            if known.any():
+                target[known] = self.history.nearest_prices(rows[known], now - seconds_ago)
+        
+        valid = (target > 0) & (current > 0)
+        percent = np.zeros(len(tracked))
+        percent[valid] = ((current[valid] - target[valid]) / target[valid]) * 100
+        return percent
     
     def get_multiple_price_changes(self, symbol: str, intervals_seconds: List[int]) -> Dict[str, Optional[Dict]]:
-        """Получить изменения цены для нескольких интервалов"""
-        result = {}
-        for i, seconds in enumerate(intervals_seconds):
-            result[f'change_interval_{i}'] = self.get_price_change(symbol, seconds)
-        return result
+        """Получить изменения цены для нескольких интервалов (одно взятие lock и один поиск символа)"""
+        now = time.time()
+        
+        with self.lock:
+            symbol_data = self.symbols_data.get(symbol)
+            if symbol_data is None:
+                return {f'change_interval_{i}': None for i in range(len(intervals_seconds))}
+            
+            tracked = [symbol_data]
+            rows = self._history_rows(tracked)
+            return {
+                f'change_interval_{i}': self._price_changes_locked(tracked, rows, seconds, now)[0]
+                for i, seconds in enumerate(intervals_seconds)
+            }
     
     def get_candles(self, symbol: str, timeframe: str = '30s', limit: int = 50) -> List[Dict]:
         """Получить свечные данные для символа и таймфрейма"""
@@ -235,76 +650,272 @@ class AdvancedPriceTracker:
             if symbol not in self.symbols_data:
                 return []
             
-            symbol_data = self.symbols_data[symbol]
-            
-            # Получаем соответствующие атрибуты
-            candles_attr = f'candles_{timeframe}'
-            current_candle_attr = f'current_candle_{timeframe}'
-            
-            if not hasattr(symbol_data, candles_attr):
+            tf_index = self.timeframe_index.get(timeframe)
+            if tf_index is None:
                 return []
             
-            candles_deque = getattr(symbol_data, candles_attr)
-            current_candle = getattr(symbol_data, current_candle_attr)
-            
-            candles = list(candles_deque)
-            
-            # Добавляем текущую свечу, если она существует
-            if current_candle:
-                candles.append(current_candle)
-            
-            # Возвращаем последние N свечей
-            return [candle.to_dict() for candle in candles[-limit:]]
+            symbol_data = self.symbols_data[symbol]
+            closed, current = self._candles_snapshot_locked(
+                symbol_data.candles[tf_index],
+                self.current_candles.candle(symbol_data.history_row, tf_index, timeframe),
+                limit
+            )
+        
+        return self._candles_to_dicts(closed, timeframe, current)
+    
+    @staticmethod
+    def _candles_snapshot_locked(ring: CandleRing, current_candle: Optional[AdvancedCandle],
+                                 limit: int) -> Tuple[np.ndarray, Optional[Dict]]:
+        """
+        Снимок последних limit свечей таймфрейма (вызывается внутри lock).
+        
+        Завершенные свечи копируются одним срезом кольца; текущая свеча меняется
+        при записи и сериализуется сразу.
+        """
+        total = len(ring) + (current_candle is not None)
+        
+        # Последние N свечей (с той же семантикой, что и срез списка [-limit:])
+        start = slice(-limit, None).indices(total)[0]
+        current = current_candle.to_dict() if current_candle is not None and start < total else None
+        return ring.tail(start), current
+    
+    @staticmethod
+    def _candles_to_dicts(closed: np.ndarray, timeframe: str, current: Optional[Dict]) -> List[Dict]:
+        """Сериализовать снимок свечей (вне lock)"""
+        result = candle_rows_to_dicts(closed, timeframe)
+        if current is not None:
+            result.append(current)
+        return result
     
     def get_symbols_batch_data(self, symbols: List[str], timeframes: List[str] = ['15s', '30s', '1m'], 
                              interval_configs: List[int] = [15, 30]) -> Dict[str, Dict]:
         """Получить данные для batch символов с множественными таймфреймами и настраиваемыми интервалами"""
         result = {}
+        now = time.time()
+        # Ключи ответа строятся один раз на вызов, а не для каждого символа
+        tf_indices = [(tf, f'candles_{tf}', self.timeframe_index.get(tf)) for tf in timeframes]
+        interval_keys = [f'change_interval_{j}' for j in range(len(interval_configs))]
         
+        # Под lock только снимаем значения и ссылки на свечи; сериализация свечей,
+        # которая занимает основное время, идет без lock и не задерживает запись цен
         with self.lock:
+            # Имена переводятся в данные символов один раз; дальше работа идет
+            # по найденным объектам и целочисленным строкам истории
+            get_symbol_data = self.symbols_data.get
+            tracked = []
             for symbol in symbols:
-                if symbol in self.symbols_data:
-                    symbol_data = self.symbols_data[symbol]
-                    
-                    if symbol_data.last_price > 0:
-                        result[symbol] = {
-                            "current_price": symbol_data.last_price,
-                            "change_15s": self.get_price_change(symbol, 15),
-                            "change_30s": self.get_price_change(symbol, 30),
-                            "last_updated": datetime.fromtimestamp(symbol_data.last_update).isoformat()
-                        }
-                        
-                        # Добавляем настраиваемые интервалы
-                        interval_changes = self.get_multiple_price_changes(symbol, interval_configs)
-                        result[symbol].update(interval_changes)
-                        
-                        # Добавляем данные по таймфреймам
-                        for tf in timeframes:
-                            result[symbol][f'candles_{tf}'] = self.get_candles(symbol, tf, 50)
+                symbol_data = get_symbol_data(symbol)
+                if symbol_data is not None and symbol_data.last_price > 0:
+                    tracked.append((symbol, symbol_data))
+            symbols = [symbol for symbol, _ in tracked]
+            present = [symbol_data for _, symbol_data in tracked]
+            
+            # Изменения цены считаются для всех символов сразу - по одному вызову на интервал
+            if present:
+                rows = self._history_rows(present)
+                changes_15s = self._price_changes_locked(present, rows, 15, now)
+                changes_30s = self._price_changes_locked(present, rows, 30, now)
+                interval_changes = [self._price_changes_locked(present, rows, seconds, now) for seconds in interval_configs]
+            else:
+                changes_15s, changes_30s = [], []
+                interval_changes = [[] for _ in interval_configs]
+            
+            snapshots = []
+            for symbol_data in present:
+                snapshots.append((
+                    symbol_data.last_price,
+                    symbol_data.last_update,
+                    [
+                        (tf, key, self._candles_snapshot_locked(
+                            symbol_data.candles[tf_index],
+                            self.current_candles.candle(symbol_data.history_row, tf_index, tf),
+                            50
+                        ) if tf_index is not None else None)
+                        for tf, key, tf_index in tf_indices
+                    ]
+                ))
+        
+        for i, (symbol, (last_price, last_update, candle_snapshots)) in enumerate(zip(symbols, snapshots)):
+            entry = result[symbol] = {
+                "current_price": last_price,
+                "change_15s": changes_15s[i],
+                "change_30s": changes_30s[i],
+                "last_updated": utc_isoformat(last_update)
+            }
+            
+            # Добавляем настраиваемые интервалы
+            for key, changes in zip(interval_keys, interval_changes):
+                entry[key] = changes[i]
+            
+            # Добавляем данные по таймфреймам
+            for tf, key, snapshot in candle_snapshots:
+                entry[key] = self._candles_to_dicts(snapshot[0], tf, snapshot[1]) if snapshot is not None else []
         
         return result
     
+    def get_page(self, symbols: List[str], sort_columns: Dict[str, np.ndarray],
+                 sort_orders: Dict[Tuple[str, bool], np.ndarray],
+                 timeframes: List[str], interval_configs: List[int],
+                 matches: Optional[np.ndarray] = None, sort_by: str = "symbol", sort_order: str = "asc",
+                 offset: int = 0, limit: int = 20,
+                 after: Optional[Tuple[Optional[float], str]] = None
+                 ) -> Tuple[List[str], Dict[str, Dict], int, Optional[Tuple[Optional[float], str]]]:
+        """
+        Поиск, сортировка и пагинация символов.
+        
+        Свечи и изменения цены собираются только для символов итоговой страницы,
+        а не для всего списка тикеров.
+        
+        Args:
+            symbols: Список символов
+            sort_columns: Числовые колонки для сортировки {имя: np.ndarray}, выровненные с symbols
+            sort_orders: Заранее отсортированные индексы symbols {(поле, desc): np.ndarray}
+            timeframes: Таймфреймы свечей для страницы
+            interval_configs: Интервалы (в секундах) для колонок change_interval_{i}
+            matches: Индексы symbols, прошедших поиск (None - все символы)
+            after: Ключ сортировки (значение, символ) последней строки прошлой страницы -
+                страница начинается со следующей за ним позиции (курсорная пагинация,
+                offset игнорируется); для сортировки по символу значение - None
+        
+        Returns:
+            Кортеж (символы страницы по порядку, {symbol: данные трекера} для отслеживаемых из них,
+            количество символов после поиска, ключ (значение, символ) последней строки
+            страницы или None, если за ней строк нет)
+        
+        Raises:
+            ValueError: если ключ after не подходит к сортировке sort_by
+        """
+        # Результат поиска (индексы в исходном порядке)
+        order = np.arange(len(symbols)) if matches is None else matches
+        
+        # Сортировка по (значение, символ); убывающий порядок - обратный возрастающему
+        reverse = sort_order.lower() == "desc"
+        presorted = sort_orders.get((sort_by, reverse))
+        if presorted is not None:
+            # Готовый порядок снимка; поиск только отфильтровывает лишние индексы
+            if matches is not None:
+                keep = np.zeros(len(symbols), dtype=bool)
+                keep[matches] = True
+                presorted = presorted[keep[presorted]]
+            keys = sort_columns[sort_by][presorted] if sort_by in sort_columns else None
+            return self._page_data(symbols, presorted, keys, reverse, timeframes, interval_configs,
+                                   offset, limit, after)
+        
+        seconds = self.FIXED_CHANGE_COLUMNS.get(sort_by)
+        if seconds is None and sort_by in self.INTERVAL_CHANGE_COLUMNS:
+            index = self.INTERVAL_CHANGE_COLUMNS[sort_by]
+            seconds = interval_configs[index] if index < len(interval_configs) else None
+        
+        values = None
+        if seconds is not None:
+            # Отсутствующие изменения сортируются как 0; ключи всех символов считаются векторно
+            symbol_at = symbols.__getitem__
+            values = self.get_percent_changes([symbol_at(i) for i in order], seconds)
+        elif sort_by in sort_columns:
+            values = sort_columns[sort_by][order]
+        elif sort_by == "symbol":
+            order = np.array(sorted(order, key=symbols.__getitem__, reverse=reverse), dtype=np.intp)
+        
+        keys = None
+        if values is not None:
+            # Равные значения - по символу (ранг символа в алфавитном порядке)
+            symbol_rank = np.empty(len(symbols), dtype=np.intp)
+            symbol_rank[np.array(sorted(range(len(symbols)), key=symbols.__getitem__), dtype=np.intp)] = np.arange(len(symbols))
+            ascending = np.lexsort((symbol_rank[order], values))
+            if reverse:
+                ascending = ascending[::-1]
+            order = order[ascending]
+            keys = values[ascending]
+        
+        return self._page_data(symbols, order, keys, reverse, timeframes, interval_configs, offset, limit, after)
+    
+    @staticmethod
+    def _cursor_offset(symbols: List[str], order: np.ndarray, keys: Optional[np.ndarray], reverse: bool,
+                       after: Tuple[Optional[float], str]) -> int:
+        """
+        Позиция первой строки после ключа (значение, символ) в упорядоченных индексах.
+        
+        Бинарный поиск по значению, затем по символу среди равных значений: курсору
+        не нужно, чтобы его строка еще была в выборке или стояла на прежнем месте.
+        """
+        value, symbol = after
+        if keys is None:
+            # Сортировка по символу - все строки "равны" по значению
+            low, high = 0, len(order)
+        else:
+            if value is None:
+                raise ValueError("Cursor has no sort value for a numeric sort")
+            # В убывающем порядке значения возрастают у -keys
+            ascending = -keys if reverse else keys
+            target = -value if reverse else value
+            low = int(np.searchsorted(ascending, target, side='left'))
+            high = int(np.searchsorted(ascending, target, side='right'))
+        
+        tie = [symbols[i] for i in order[low:high]]
+        if reverse:
+            # Символы равных значений идут по убыванию
+            return high - bisect_left(tie[::-1], symbol)
+        return low + bisect_right(tie, symbol)
+    
+    def _page_data(self, symbols: List[str], order: np.ndarray, keys: Optional[np.ndarray], reverse: bool,
+                   timeframes: List[str], interval_configs: List[int], offset: int, limit: int,
+                   after: Optional[Tuple[Optional[float], str]] = None
+                   ) -> Tuple[List[str], Dict[str, Dict], int, Optional[Tuple[Optional[float], str]]]:
+        """Вырезать страницу из упорядоченных индексов (keys - их значения сортировки) и собрать для нее данные трекера"""
+        total = len(order)
+        if after is not None:
+            offset = self._cursor_offset(symbols, order, keys, reverse, after)
+        
+        page = order[offset:offset + limit]
+        page_symbols = [symbols[i] for i in page]
+        tracked_data = self.get_symbols_batch_data(page_symbols, timeframes, interval_configs)
+        
+        next_after = None
+        if offset + limit < total and len(page):
+            last = offset + len(page) - 1
+            next_after = (float(keys[last]) if keys is not None else None, page_symbols[-1])
+        
+        return page_symbols, tracked_data, total, next_after
+    
+    def update_ticker_snapshot(self, snapshot):
+        """Заменить снимок 24h данных тикеров"""
+        self.ticker_snapshot = snapshot
+    
+    def get_ticker_snapshot(self):
+        """Получить последний снимок 24h данных тикеров (None до первого обновления)"""
+        return self.ticker_snapshot
+    
     def get_active_symbols_count(self) -> int:
         """Получить количество активных символов"""
         with self.lock:
-            return len(self.active_symbols)
+            return len(self.symbols_data)
     
     def cleanup_old_data(self):
         """Очистить старые данные"""
-        cutoff_time = datetime.utcnow().timestamp() - 3600  # 1 час
+        cutoff_time = time.time() - self.inactive_seconds
         inactive_symbols = []
         
+        # Из очереди извлекаются только записи старше cutoff_time, поэтому под lock
+        # работа пропорциональна числу кандидатов, а не всех символов
         with self.lock:
-            for symbol, symbol_data in self.symbols_data.items():
-                if symbol_data.last_update < cutoff_time:
-                    inactive_symbols.append(symbol)
-            
-            for symbol in inactive_symbols:
+            heap = self._expiry_heap
+            while heap and heap[0][0] < cutoff_time:
+                _, symbol = heapq.heappop(heap)
+                symbol_data = self.symbols_data.get(symbol)
+                if symbol_data is None:
+                    continue
+                if symbol_data.last_update >= cutoff_time:
+                    # Символ обновлялся после постановки в очередь - переставляем
+                    heapq.heappush(heap, (symbol_data.last_update, symbol))
+                    continue
+                
                 del self.symbols_data[symbol]
-                self.active_symbols.discard(symbol)
+                self.history.release_row(symbol_data.history_row)
+                self.current_candles.release_row(symbol_data.history_row)
+                inactive_symbols.append(symbol)
         
         if inactive_symbols:
-            logger.info(f"Cleaned up {len(inactive_symbols)} inactive symbols")
+            logger.info("Cleaned up %d inactive symbols", len(inactive_symbols))
 
 # Глобальный экземпляр продвинутого трекера
 advanced_price_tracker = AdvancedPriceTracker()
\ No newline at end of file
@@ -1,22 +1,30 @@
-import asyncio
+import heapq
 import logging
-from typing import Dict, List, Optional, Set
-from datetime import datetime, timedelta
-from dataclasses import dataclass, field
-from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+from functools import lru_cache
+from operator import itemgetter
 import threading
-from .price_tracker_advanced import AdvancedCandle, AdvancedSymbolData
+import time
+import numpy as np
+from .price_tracker_advanced import AdvancedCandle, AdvancedPriceTracker, AdvancedSymbolData, PriceHistoryBuffer, TIMEFRAME_INDEX, utc_isoformat
 
 logger = logging.getLogger(__name__)
 
 class PriceTrackerWithHistory:
     """Продвинутый трекер цен с предварительной загрузкой исторических данных"""
     
+    # Поля исторической свечи, без которых она не загружается
+    HISTORICAL_CANDLE_FIELDS = frozenset(('open', 'high', 'low', 'close', 'volume', 'timestamp'))
+    # Те же поля в порядке столбцов кольца: значения свечи забираются одним вызовом на C
+    _historical_candle_values = itemgetter('open', 'high', 'low', 'close', 'volume', 'timestamp')
+    
     def __init__(self):
         self.symbols_data: Dict[str, AdvancedSymbolData] = {}
-        self.active_symbols: Set[str] = set()
         self.lock = threading.RLock()
         self.historical_data_loaded = False
+        # Очередь на проверку устаревания: (last_update на момент постановки, symbol),
+        # как в AdvancedPriceTracker
+        self._expiry_heap: List[Tuple[float, str]] = []
         
         # Таймфреймы в секундах
         self.timeframes = {
@@ -29,6 +37,15 @@ class PriceTrackerWithHistory:
             '4h': 14400,
             '1d': 86400
         }
+        # (индекс слотов в AdvancedSymbolData, имя, секунды) - разрешается один раз,
+        # а не поиском по имени на каждом тике
+        self._tf_order = [
+            (TIMEFRAME_INDEX[name], name, seconds)
+            for name, seconds in self.timeframes.items()
+            if name in TIMEFRAME_INDEX
+        ]
+        # Границы свечей зависят только от целой секунды: точки одной секунды берут их из кэша
+        self._candle_bounds = lru_cache(maxsize=4)(self._compute_candle_bounds)
     
     def populate_historical_data(self, historical_data: Dict[str, Dict[str, List[Dict]]]):
         """
@@ -41,178 +58,212 @@ class PriceTrackerWithHistory:
         
         with self.lock:
             for symbol, symbol_timeframes in historical_data.items():
-                if symbol not in self.symbols_data:
-                    self.symbols_data[symbol] = AdvancedSymbolData(symbol=symbol)
-                    self.active_symbols.add(symbol)
-                
-                symbol_data = self.symbols_data[symbol]
+                symbol_data = self.symbols_data.get(symbol)
+                created = symbol_data is None
+                if created:
+                    symbol_data = self.symbols_data[symbol] = AdvancedSymbolData(symbol=symbol, price_history=PriceHistoryBuffer(500))
                 
                 # Заполняем исторические свечи для каждого таймфрейма
                 for timeframe, candles in symbol_timeframes.items():
-                    if not candles:
+                    tf_index = TIMEFRAME_INDEX.get(timeframe)
+                    if not candles or tf_index is None:
+                        continue
+                    
+                    try:
+                        rows = self._historical_candle_rows(candles, self.timeframes.get(timeframe, 60))
+                    except (TypeError, ValueError) as e:
+                        logger.warning(f"Error converting candles for {symbol} {timeframe}: {str(e)}")
                         continue
                     
-                    # Конвертируем словари обратно в AdvancedCandle объекты
-                    candle_objects = []
-                    for candle_dict in candles:
-                        try:
-                            candle = AdvancedCandle(
-                                open=candle_dict['open'],
-                                high=candle_dict['high'],
-                                low=candle_dict['low'],
-                                close=candle_dict['close'],
-                                volume=candle_dict['volume'],
-                                start_time=candle_dict['timestamp'] / 1000,  # Конвертируем мс в секунды
-                                end_time=(candle_dict['timestamp'] + self.timeframes.get(timeframe, 60) * 1000) / 1000,
-                                timeframe=timeframe
-                            )
-                            candle_objects.append(candle)
-                        except Exception as e:
-                            logger.warning(f"Error converting candle for {symbol} {timeframe}: {str(e)}")
-                            continue
+                    skipped = len(candles) - len(rows)
+                    if skipped:
+                        logger.warning(f"Skipped {skipped} incomplete candles for {symbol} {timeframe}")
                     
-                    # Заполняем соответствующую deque
-                    candles_attr = f'candles_{timeframe}'
-                    if hasattr(symbol_data, candles_attr):
-                        candles_deque = getattr(symbol_data, candles_attr)
-                        candles_deque.extend(candle_objects)
-                        
-                        # Устанавливаем последнюю цену из последней свечи
-                        if candle_objects:
-                            last_candle = candle_objects[-1]
-                            symbol_data.last_price = last_candle.close
-                            symbol_data.last_update = last_candle.end_time
+                    # Заполняем соответствующее кольцо свечей (копированием блоков, с обрезкой до емкости)
+                    symbol_data.candles[tf_index].extend(rows)
+                    
+                    # Устанавливаем последнюю цену из последней свечи
+                    if len(rows):
+                        symbol_data.last_price = float(rows[-1, 3])
+                        symbol_data.last_update = float(rows[-1, 6])
+                
+                if created:
+                    heapq.heappush(self._expiry_heap, (symbol_data.last_update, symbol))
                 
                 logger.debug(f"Populated historical data for {symbol}: {len(symbol_timeframes)} timeframes")
         
         self.historical_data_loaded = True
         logger.info(f"Historical data population completed for {len(historical_data)} symbols")
     
+    def _historical_candle_rows(self, candles: List[Dict], duration_seconds: int) -> np.ndarray:
+        """
+        Строки кольца (open, high, low, close, volume, start_time, end_time) из свечей MEXC
+        
+        Значения свечей забираются без промежуточных AdvancedCandle, границы свечей
+        считаются над всем столбцом сразу. Свечи без нужных полей отбрасываются.
+        Время MEXC - в мс, в кольце - в секундах.
+        """
+        try:
+            values = list(map(self._historical_candle_values, candles))
+        except KeyError:
+            values = [
+                self._historical_candle_values(candle)
+                for candle in candles
+                if self.HISTORICAL_CANDLE_FIELDS <= candle.keys()
+            ]
+        values = np.array(values, dtype=np.float64).reshape(-1, 6)
+        
+        timestamps = values[:, 5]
+        rows = np.empty((len(values), 7))
+        rows[:, :5] = values[:, :5]
+        rows[:, 5] = timestamps / 1000
+        rows[:, 6] = (timestamps + duration_seconds * 1000) / 1000
+        return rows
+    
     def add_price_point(self, symbol: str, price: float, volume: float = 0):
         """Добавить новую точку цены (использует логику из AdvancedPriceTracker)"""
         if price <= 0:
             return
             
-        now = datetime.utcnow().timestamp()
+        now = time.time()
         
         with self.lock:
-            if symbol not in self.symbols_data:
-                self.symbols_data[symbol] = AdvancedSymbolData(symbol=symbol)
-                self.active_symbols.add(symbol)
-            
-            symbol_data = self.symbols_data[symbol]
-            
-            # Добавляем точку в историю
-            from .price_tracker_advanced import PricePoint
-            price_point = PricePoint(price=price, timestamp=now, volume=volume)
-            symbol_data.price_history.append(price_point)
-            symbol_data.last_price = price
-            symbol_data.last_update = now
-            
-            # Обновляем свечи для всех таймфреймов
-            self._update_all_candles(symbol_data, price_point)
+            self._add_price_point_locked(symbol, price, volume, now)
     
-    def _update_all_candles(self, symbol_data: AdvancedSymbolData, price_point):
-        """Обновить свечи для всех таймфреймов"""
-        for tf_name, tf_seconds in self.timeframes.items():
-            self._update_candle_for_timeframe(symbol_data, price_point, tf_name, tf_seconds)
+    def add_price_points_batch(self, points: Iterable[Tuple[str, float, float]],
+                               timestamp: Optional[float] = None):
+        """
+        Добавить пачку точек цены за одно взятие lock
+        
+        Args:
+            points: Кортежи (symbol, price, volume); все точки получают одно время
+            timestamp: Время точек (UTC timestamp), по умолчанию - текущее
+        """
+        now = time.time() if timestamp is None else timestamp
+        
+        with self.lock:
+            for symbol, price, volume in points:
+                if price > 0:
+                    self._add_price_point_locked(symbol, price, volume, now)
     
-    def _update_candle_for_timeframe(self, symbol_data: AdvancedSymbolData, price_point, 
-                                   timeframe: str, duration_seconds: int):
-        """Обновить свечу для конкретного таймфрейма"""
-        now = price_point.timestamp
+    def _add_price_point_locked(self, symbol: str, price: float, volume: float, now: float):
+        """Добавить точку цены и обновить все таймфреймы (вызывается внутри lock)"""
+        symbol_data = self.symbols_data.get(symbol)
+        if symbol_data is None:
+            symbol_data = self.symbols_data[symbol] = AdvancedSymbolData(symbol=symbol, price_history=PriceHistoryBuffer(500))
+            heapq.heappush(self._expiry_heap, (now, symbol))
         
-        # Получаем атрибуты для данного таймфрейма
-        candles_attr = f'candles_{timeframe}'
-        current_candle_attr = f'current_candle_{timeframe}'
-        current_start_attr = f'current_candle_start_{timeframe}'
+        # Добавляем точку в историю (столбцы NumPy, без объекта на точку)
+        symbol_data.price_history.append(now, price, volume)
+        symbol_data.last_price = price
+        symbol_data.last_update = now
         
-        if not hasattr(symbol_data, candles_attr):
+        # Обновляем свечи для всех таймфреймов
+        self._update_all_candles(symbol_data, price, volume, now)
+    
+    def _update_all_candles(self, symbol_data: AdvancedSymbolData, price: float, volume: float, now: float):
+        """Обновить свечи для всех таймфреймов"""
+        seconds = int(now)
+        if seconds == symbol_data.candle_second:
+            # Та же секунда, что и у прошлой точки: ни одна граница не пересечена
+            # (все таймфреймы кратны секунде) - только слияние цены в текущие свечи
+            current = symbol_data.current
+            for tf_index, _, _ in self._tf_order:
+                current_candle = current[tf_index]
+                if price > current_candle.high:
+                    current_candle.high = price
+                elif price < current_candle.low:
+                    current_candle.low = price
+                current_candle.close = price
+                current_candle.volume += volume
             return
         
-        candles_deque = getattr(symbol_data, candles_attr)
-        current_candle = getattr(symbol_data, current_candle_attr)
-        current_start = getattr(symbol_data, current_start_attr)
-        
-        # Определяем начало текущего интервала
-        candle_start = self._get_candle_start_time(now, duration_seconds)
-        candle_end = candle_start + duration_seconds
+        symbol_data.candle_second = seconds
+        for tf_index, tf_name, candle_start, candle_end in self._candle_bounds(seconds):
+            self._update_candle_for_timeframe(symbol_data, price, volume, tf_index, tf_name, candle_start, candle_end)
+    
+    def _compute_candle_bounds(self, seconds: int) -> Tuple[Tuple[int, str, int, int], ...]:
+        """(индекс, имя, начало, конец) текущей свечи каждого таймфрейма для целой секунды seconds"""
+        bounds = []
+        for tf_index, tf_name, duration_seconds in self._tf_order:
+            candle_start = seconds - seconds % duration_seconds
+            bounds.append((tf_index, tf_name, candle_start, candle_start + duration_seconds))
+        return tuple(bounds)
+    
+    def _update_candle_for_timeframe(self, symbol_data: AdvancedSymbolData, price: float, volume: float,
+                                   tf_index: int, timeframe: str, candle_start: int, candle_end: int):
+        """Обновить свечу для конкретного таймфрейма"""
+        # Слоты свечей данного таймфрейма
+        candles_ring = symbol_data.candles[tf_index]
+        current_candle = symbol_data.current[tf_index]
+        current_start = symbol_data.start[tf_index]
         
         # Если это новый интервал или первая свеча
         if current_candle is None or current_start != candle_start:
             # Завершаем предыдущую свечу
             if current_candle is not None:
-                candles_deque.append(current_candle)
+                candles_ring.append(current_candle)
             
             # Создаем новую свечу
             new_candle = AdvancedCandle(
-                open=price_point.price,
-                high=price_point.price,
-                low=price_point.price,
-                close=price_point.price,
-                volume=price_point.volume,
+                open=price,
+                high=price,
+                low=price,
+                close=price,
+                volume=volume,
                 start_time=candle_start,
                 end_time=candle_end,
                 timeframe=timeframe
             )
             
-            setattr(symbol_data, current_candle_attr, new_candle)
-            setattr(symbol_data, current_start_attr, candle_start)
+            symbol_data.current[tf_index] = new_candle
+            symbol_data.start[tf_index] = candle_start
         else:
-            # Обновляем текущую свечу
-            current_candle.high = max(current_candle.high, price_point.price)
-            current_candle.low = min(current_candle.low, price_point.price)
-            current_candle.close = price_point.price
-            current_candle.volume += price_point.volume
+            # Обновляем текущую свечу (сравнения дешевле вызовов max/min;
+            # low <= high, поэтому цена обновляет не больше одной границы)
+            if price > current_candle.high:
+                current_candle.high = price
+            elif price < current_candle.low:
+                current_candle.low = price
+            current_candle.close = price
+            current_candle.volume += volume
             current_candle.end_time = candle_end
     
-    def _get_candle_start_time(self, timestamp: float, duration_seconds: int) -> float:
-        """Получить время начала свечи для данного timestamp и таймфрейма"""
-        return (int(timestamp) // duration_seconds) * duration_seconds
-    
     def get_price_change(self, symbol: str, seconds_ago: int) -> Optional[Dict]:
         """Получить изменение цены за указанное количество секунд"""
         with self.lock:
             if symbol not in self.symbols_data:
                 return None
             
-            symbol_data = self.symbols_data[symbol]
-            if not symbol_data.price_history:
-                return None
-            
-            now = datetime.utcnow().timestamp()
-            target_time = now - seconds_ago
-            
-            # Находим ближайшую точку по времени
-            target_price = None
-            min_time_diff = float('inf')
-            
-            for point in reversed(symbol_data.price_history):
-                time_diff = abs(point.timestamp - target_time)
-                if time_diff < min_time_diff:
-                    min_time_diff = time_diff
-                    target_price = point.price
-                    
-                    if time_diff < 1.0:
-                        break
-            
-            if target_price is None or target_price <= 0:
-                return None
+            return self._price_changes_locked(self.symbols_data[symbol], [seconds_ago], time.time())[0]
+    
+    def _price_changes_locked(self, symbol_data: AdvancedSymbolData, seconds_list: List[int],
+                              now: float) -> List[Optional[Dict]]:
+        """Изменения цены символа на момент now для каждого интервала (вызывается внутри lock)"""
+        if not symbol_data.price_history:
+            return [None] * len(seconds_list)
+        
+        # Ближайшие точки для всех интервалов - один бинарный поиск
+        target_prices = symbol_data.price_history.nearest_prices([now - seconds_ago for seconds_ago in seconds_list])
+        current_price = symbol_data.last_price
+        
+        result = []
+        for seconds_ago, target_price in zip(seconds_list, target_prices):
+            if target_price is None or target_price <= 0 or current_price <= 0:
+                result.append(None)
+                continue
             
-            current_price = symbol_data.last_price
-            if current_price <= 0:
-                return None
-                
             price_change = current_price - target_price
             percent_change = (price_change / target_price) * 100
             
-            return {
+            result.append({
                 "price_change": price_change,
                 "percent_change": percent_change,
                 "seconds_ago": seconds_ago,
                 "old_price": target_price,
                 "current_price": current_price
-            }
+            })
+        return result
     
     def get_candles(self, symbol: str, timeframe: str = '30s', limit: int = 50) -> List[Dict]:
         """Получить свечные данные для символа и таймфрейма"""
@@ -220,54 +271,67 @@ class PriceTrackerWithHistory:
             if symbol not in self.symbols_data:
                 return []
             
-            symbol_data = self.symbols_data[symbol]
-            
-            # Получаем соответствующие атрибуты
-            candles_attr = f'candles_{timeframe}'
-            current_candle_attr = f'current_candle_{timeframe}'
-            
-            if not hasattr(symbol_data, candles_attr):
+            tf_index = TIMEFRAME_INDEX.get(timeframe)
+            if tf_index is None:
                 return []
             
-            candles_deque = getattr(symbol_data, candles_attr)
-            current_candle = getattr(symbol_data, current_candle_attr)
-            
-            candles = list(candles_deque)
-            
-            # Добавляем текущую свечу, если она существует
-            if current_candle:
-                candles.append(current_candle)
-            
-            # Возвращаем последние N свечей
-            return [candle.to_dict() for candle in candles[-limit:]]
+            # Свечи хранятся так же, как в AdvancedPriceTracker
+            symbol_data = self.symbols_data[symbol]
+            closed, current = AdvancedPriceTracker._candles_snapshot_locked(
+                symbol_data.candles[tf_index], symbol_data.current[tf_index], limit
+            )
+        
+        return AdvancedPriceTracker._candles_to_dicts(closed, timeframe, current)
     
     def get_symbols_batch_data(self, symbols: List[str], timeframes: List[str] = ['15s', '30s', '1m']) -> Dict[str, Dict]:
         """Получить данные для batch символов с множественными таймфреймами"""
         result = {}
+        now = time.time()
+        # Ключи ответа строятся один раз на вызов, а не для каждого символа
+        tf_indices = [(tf, f'candles_{tf}', TIMEFRAME_INDEX.get(tf)) for tf in timeframes]
         
+        # Под lock только снимаем значения и срезы свечей; форматирование времени
+        # и сериализация свечей идут без lock и не задерживают запись цен
+        snapshots = []
         with self.lock:
             for symbol in symbols:
-                if symbol in self.symbols_data:
-                    symbol_data = self.symbols_data[symbol]
-                    
-                    if symbol_data.last_price > 0:
-                        result[symbol] = {
-                            "current_price": symbol_data.last_price,
-                            "change_15s": self.get_price_change(symbol, 15),
-                            "change_30s": self.get_price_change(symbol, 30),
-                            "last_updated": datetime.fromtimestamp(symbol_data.last_update).isoformat()
-                        }
-                        
-                        # Добавляем данные по таймфреймам
-                        for tf in timeframes:
-                            result[symbol][f'candles_{tf}'] = self.get_candles(symbol, tf, 50)
+                symbol_data = self.symbols_data.get(symbol)
+                if symbol_data is None or symbol_data.last_price <= 0:
+                    continue
+                
+                snapshots.append((
+                    symbol,
+                    symbol_data.last_price,
+                    symbol_data.last_update,
+                    self._price_changes_locked(symbol_data, [15, 30], now),
+                    [
+                        (tf, key, AdvancedPriceTracker._candles_snapshot_locked(
+                            symbol_data.candles[tf_index], symbol_data.current[tf_index], 50
+                        ) if tf_index is not None else None)
+                        for tf, key, tf_index in tf_indices
+                    ]
+                ))
+        
+        for symbol, last_price, last_update, (change_15s, change_30s), candle_snapshots in snapshots:
+            entry = result[symbol] = {
+                "current_price": last_price,
+                "change_15s": change_15s,
+                "change_30s": change_30s,
+                "last_updated": utc_isoformat(last_update)
+            }
+            
+            # Добавляем данные по таймфреймам
+            for tf, key, snapshot in candle_snapshots:
+                entry[key] = (
+                    AdvancedPriceTracker._candles_to_dicts(snapshot[0], tf, snapshot[1]) if snapshot is not None else []
+                )
         
         return result
     
     def get_active_symbols_count(self) -> int:
         """Получить количество активных символов"""
         with self.lock:
-            return len(self.active_symbols)
+            return len(self.symbols_data)
     
     def is_historical_data_loaded(self) -> bool:
         """Проверить, загружены ли исторические данные"""
@@ -275,17 +339,24 @@ class PriceTrackerWithHistory:
     
     def cleanup_old_data(self):
         """Очистить старые данные"""
-        cutoff_time = datetime.utcnow().timestamp() - 3600  # 1 час
+        cutoff_time = time.time() - 3600  # 1 час
         inactive_symbols = []
         
+        # Из очереди извлекаются только записи старше cutoff_time, а не все символы
         with self.lock:
-            for symbol, symbol_data in self.symbols_data.items():
-                if symbol_data.last_update < cutoff_time:
-                    inactive_symbols.append(symbol)
-            
-            for symbol in inactive_symbols:
+            heap = self._expiry_heap
+            while heap and heap[0][0] < cutoff_time:
+                _, symbol = heapq.heappop(heap)
+                symbol_data = self.symbols_data.get(symbol)
+                if symbol_data is None:
+                    continue
+                if symbol_data.last_update >= cutoff_time:
+                    # Символ обновлялся после постановки в очередь - переставляем
+                    heapq.heappush(heap, (symbol_data.last_update, symbol))
+                    continue
+                
                 del self.symbols_data[symbol]
-                self.active_symbols.discard(symbol)
+                inactive_symbols.append(symbol)
         
         if inactive_symbols:
             logger.info(f"Cleaned up {len(inactive_symbols)} inactive symbols")
@@ -0,0 +1,78 @@
+import logging
+from typing import Dict, Optional, Tuple
+import orjson
+
+logger = logging.getLogger(__name__)
+
+class RedisTickerCache:
+    """
+    Общий (L2) кэш снимка тикеров MEXC в Redis для нескольких воркеров.
+
+    Первый воркер, не нашедший свежий снимок, запрашивает MEXC и кладет ответ
+    в Redis на один тик; остальные воркеры берут его оттуда, поэтому нагрузка
+    на MEXC не растет с числом воркеров. Снимок хранится вместе со временем
+    получения (fetched_at), чтобы читатель мог отличить уже учтенный снимок от нового.
+    Без REDIS_URL кэш выключен.
+    """
+
+    def __init__(self, url: Optional[str], key: str = "mexc:snapshot:v2", ttl: float = 2.0):
+        self.url = url
+        self.key = key
+        self.ttl = ttl
+        self.client = None
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.url)
+
+    def get_client(self):
+        """Получить или создать клиент Redis (пакет redis нужен только при заданном REDIS_URL)"""
+        if self.client is None:
+            import redis.asyncio as redis
+            self.client = redis.from_url(self.url)
+        return self.client
+
+    async def get(self) -> Optional[Tuple[float, Dict[str, Dict]]]:
+        """Получить (fetched_at, {symbol: raw_data}) или None, если снимка нет или Redis недоступен"""
+        if not self.enabled:
+            return None
+
+        try:
+            raw = await self.get_client().get(self.key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Redis ticker cache get failed: %s", e)
+            return None
+
+        if raw is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        entry = orjson.loads(raw)
+        return entry["fetched_at"], entry["tickers"]
+
+    async def set(self, tickers: Dict[str, Dict], fetched_at: float):
+        """Сохранить снимок тикеров, полученный из MEXC в fetched_at, на ttl секунд"""
+        if not self.enabled:
+            return
+
+        try:
+            body = orjson.dumps({"fetched_at": fetched_at, "tickers": tickers})
+            await self.get_client().set(self.key, body, px=int(self.ttl * 1000))
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Redis ticker cache set failed: %s", e)
+
+    def get_stats(self) -> Dict:
+        """Счетчики попаданий/промахов для /health"""
+        return {"hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+    async def close(self):
+        """Закрыть соединение с Redis"""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None